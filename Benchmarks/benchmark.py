@@ -0,0 +1,404 @@
+#!/usr/bin/python
+
+# MIT License
+# Copyright (c) 2012 Jean-Etienne Morlighem <jem.nvnt@gmail.com>
+# https://github.com/jem-gh/STconverter
+
+###############################################################################
+# Benchmark of STconverter: SimpleGUI programs of increasing size are
+# generated with a tunable number of draw calls, buttons, labels, inputs,
+# timers, key/mouse handlers, and image draws, then converted, and the time
+# of the whole conversion and of each pass is written as JSON.
+#
+# Usage (from the repository):
+#
+#   ./Benchmarks/benchmark.py --scale 1 2 4 8 -o results.json
+#   ./Benchmarks/benchmark.py --scale 1 2 4 8 --compare results.json
+#
+# The "scaling" value of each series is the exponent k of time ~ size^k
+# between its smallest and largest program: about 1 for a conversion time
+# growing linearly with the program, and more for a superlinear one.
+#
+# With --pathological, programs with long unbalanced lines (which made the
+# conversion backtrack exponentially) are converted with a time budget, and
+# the benchmark fails if any of them is stopped:
+#
+#   ./Benchmarks/benchmark.py --pathological --budget 1
+#
+# With --engine token, the conversions use the token engine of STconverter
+# (passes run only over the lines found by one scan) instead of the regex one.
+#
+# The memory used by each conversion is also written: the copies of the code
+# made by the passes (their number and total size), and the peak of the memory
+# allocated during the conversion, in an extra conversion, not timed. The peak
+# is measured with tracemalloc on Python 3, and estimated from the copies of
+# the code on Python 2 (the size of the two versions of the code held during
+# the largest copy, and of the input code: a lower bound of the peak).
+###############################################################################
+
+
+import os, sys
+import json
+import math
+import time
+import platform
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import STconverter
+
+
+
+# number of each SimpleGUI element in a program of scale 1
+DEFAULT = {
+"draws"   : 100,
+"buttons" : 5,
+"labels"  : 5,
+"inputs"  : 2,
+"timers"  : 2,
+"keys"    : 1,
+"mouse"   : 1,
+"images"  : 10
+}
+
+# draw calls repeated in the draw handler, written in the different ways
+# handled by STconverter (digits, variables, names, colors, multiline)
+DRAWS = [
+"    canvas.draw_text('Score: ' + str(score), [{x}, {y}], 12, 'White')",
+"    t{n} = canvas.draw_text(message, (pos[0] + {x}, {y}), size, \"Lime\")",
+"    canvas.draw_circle(({x}, {y}), 20, 3, 'Blue', 'Orange')",
+"    c{n} = canvas.draw_circle(ball_pos, radius + {n}, 2, \"Aqua\")",
+"    canvas.draw_line([{x}, {y}], ({y}, {x}), 5, 'Red')",
+"    canvas.draw_line(start, end, width, color)",
+"    canvas.draw_polyline([({x}, {y}), ({y}, {x}), ({x}, {x})], 4, 'Green')",
+"    canvas.draw_polyline(points, 2, 'Teal')",
+"    canvas.draw_polygon([[{x}, {y}], [{y}, {y}], \\\n"
+"                         [{y}, {x}]], 6, 'Silver', 'Olive')",
+"    p{n} = canvas.draw_polygon(points, 1, \"Fuchsia\")"
+]
+
+
+def generate_program(draws=0, buttons=0, labels=0, inputs=0, timers=0,
+                     keys=0, mouse=0, images=0):
+    """ return the code of a SimpleGUI program using the given number of
+        each element """
+
+    code = ["# generated by Benchmarks/benchmark.py",
+            "import simplegui",
+            "import math",
+            "",
+            "score = 0",
+            "message = 'Hello'",
+            "pos = [10, 20]",
+            "size = 14",
+            "ball_pos = [150, 150]",
+            "radius = 10",
+            "start, end, width, color = [0, 0], [100, 100], 2, 'Yellow'",
+            "points = [(10, 10), (50, 90), (90, 10)]",
+            "angle = 0",
+            "KEY = 'left'",
+            ""]
+
+    for n in range(images):
+        code.append("image{n} = simplegui.load_image("
+                    "'http://example.com/image{n}.png')".format(n=n))
+
+    # handlers of the control panel, timers, keys and mouse
+    for n in range(buttons):
+        code += ["def button{n}_handler():".format(n=n),
+                 "    global score",
+                 "    score += {n}".format(n=n), ""]
+    for n in range(inputs):
+        code += ["def input{n}_handler(text):".format(n=n),
+                 "    global message",
+                 "    message = text", ""]
+    for n in range(timers):
+        code += ["def timer{n}_handler():".format(n=n),
+                 "    global angle",
+                 "    angle += 0.{n}".format(n=n + 1), ""]
+    if keys:
+        code += ["def keydown(key):",
+                 "    global score",
+                 "    if key == simplegui.KEY_MAP['space']:",
+                 "        score = 0",
+                 "    elif key == simplegui.KEY_MAP[KEY]:",
+                 "        score -= 1", "",
+                 "def keyup(key):",
+                 "    print chr(key)", ""]
+    if mouse:
+        code += ["def click(position):",
+                 "    pos[0], pos[1] = position", "",
+                 "def drag(position):",
+                 "    ball_pos[0], ball_pos[1] = position", ""]
+
+    # draw handler
+    code.append("def draw(canvas):")
+    for n in range(draws):
+        code.append(DRAWS[n % len(DRAWS)].format(n=n, x=n % 500, y=(n * 7) % 500))
+    for n in range(images):
+        code.append("    canvas.draw_image(image{n}, (50, 50), (100, 100), "
+                    "({x}, {y}), (75, 75), angle)".format(n=n, x=n % 500,
+                                                         y=(n * 3) % 500))
+    code.append("    pass")
+    code.append("")
+
+    # frame and registration of the handlers
+    code += ["frame = simplegui.create_frame('Benchmark', 500, 500, 200)",
+             "frame.set_draw_handler(draw)",
+             "frame.set_canvas_background('Navy')"]
+    if keys:
+        code += ["frame.set_keydown_handler(keydown)",
+                 "frame.set_keyup_handler(keyup)"]
+    if mouse:
+        code += ["frame.set_mouseclick_handler(click)",
+                 "frame.set_mousedrag_handler(drag)"]
+    for n in range(buttons):
+        code.append("frame.add_button('Button {n}', button{n}_handler, "
+                    "100)".format(n=n))
+    for n in range(labels):
+        code.append("label{n} = frame.add_label('Label {n}')".format(n=n))
+    for n in range(inputs):
+        code.append("frame.add_input('Input {n}', input{n}_handler, "
+                    "100)".format(n=n))
+    for n in range(timers):
+        code += ["timer{n} = simplegui.create_timer(100, "
+                 "timer{n}_handler)".format(n=n),
+                 "timer{n}.start()".format(n=n)]
+    code += ["frame.start()", ""]
+
+    return "\n".join(code)
+
+
+# SimpleGUI calls never closed, with a long argument repeating the given text
+PATHOLOGICAL = {
+"text"     : ("def draw(canvas):\n    canvas.draw_text(", "f(x) + "),
+"textq"    : ("def draw(canvas):\n    canvas.draw_text(", "'a' + "),
+"polyline" : ("def draw(canvas):\n    canvas.draw_polyline([", "(1, 2), "),
+"button"   : ("frame.add_button(", "a "),
+"label"    : ("label = frame.add_label(", "a"),
+"input"    : ("frame.add_input('Input' ", " "),
+"timer"    : ("timer = simplegui.create_timer(100, f(", "a, ")
+}
+
+
+def generate_pathological(case, size):
+    """ return the code of a SimpleGUI program with 10 unbalanced lines of a 
+        pathological case, their argument repeating its text size times """
+
+    start, text = PATHOLOGICAL[case]
+    line = start + text * size + "!\n"
+    return "import simplegui\n" \
+           "frame = simplegui.create_frame('Benchmark', 500, 500)\n" + \
+           line * 10 + "frame.start()\n"
+
+
+def run_pathological(sizes, budget, engine="regex"):
+    """ convert the pathological programs of each size with a time budget, 
+        return the time of each conversion (None if it was stopped) """
+
+    results = {}
+    for case in sorted(PATHOLOGICAL):
+        results[case] = []
+        for size in sizes:
+            converter = STconverter.Simplegui2Tkinter(
+                            generate_pathological(case, size), time_budget=budget,
+                            engine=engine)
+            start = time.time()
+            try:
+                converter.convert()
+                elapsed = time.time() - start
+            except STconverter.ConversionTimeout:
+                elapsed = None
+            results[case].append({"size": size, "time": elapsed})
+            print("{c:<10} x{k:<5} {t}".format(c=case, k=size, 
+                      t="{0:9.4f}s".format(elapsed) if elapsed is not None 
+                        else "  stopped (over {0}s)".format(budget)))
+    return results
+
+
+def peak_memory(code, engine="regex"):
+    """ return the peak of the memory allocated while converting code (in
+        bytes), and how it was found: "measured" by tracemalloc, or on Python 2
+        (without tracemalloc) "estimated" from the copies of the code, as the
+        size of the input code (kept by the converter) and of the two versions
+        of the code held at once during the largest copy (a lower bound of the
+        peak, the other objects of the conversion being left out) """
+
+    converter = STconverter.Simplegui2Tkinter(code, engine=engine)
+    try:
+        import tracemalloc
+    except ImportError:
+        converter.convert()
+        copies = [stats["bytes_in"] + stats["bytes_out"]
+                  for stats in converter.profile if stats["copies"]]
+        return len(code) + max(copies + [0]), "estimated"
+
+    tracemalloc.start()
+    try:
+        converter.convert()
+        return tracemalloc.get_traced_memory()[1], "measured"
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(params, repeat, engine="regex"):
+    """ convert the program generated with params repeat times, return the
+        best time of the whole conversion and the time of each pass during
+        the best conversion, and the memory used by the conversion """
+
+    code = generate_program(**params)
+    best = None
+    peak, found = peak_memory(code, engine)
+
+    for r in range(repeat):
+        converter = STconverter.Simplegui2Tkinter(code, engine=engine)
+        start = time.time()
+        converter.convert()
+        elapsed = time.time() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, converter.profile)
+
+    return {"params": params,
+            "lines": code.count("\n") + 1,
+            "bytes": len(code),
+            "time": best[0],
+            "copies": sum(stats["copies"] for stats in best[1]),
+            "bytes_copied": sum(stats["bytes_copied"] for stats in best[1]),
+            "peak_memory": peak,
+            "peak_memory_found": found,
+            "passes": dict((stats["pass"], {"time": stats["time"],
+                                            "regex": stats["regex"],
+                                            "matches": stats["matches"],
+                                            "copies": stats["copies"]})
+                           for stats in best[1])}
+
+
+def scaling(cases):
+    """ return the exponent k of time ~ size^k between the smallest and the
+        largest program of a series """
+
+    first, last = cases[0], cases[-1]
+    if last["bytes"] == first["bytes"] or not first["time"] or not last["time"]:
+        return None
+    return math.log(last["time"] / first["time"]) / \
+           math.log(float(last["bytes"]) / first["bytes"])
+
+
+def run(scales, repeat, series, engine="regex"):
+    """ run the benchmark: for each series, the elements it varies are
+        multiplied by each scale (the others keep their default number) """
+
+    results = {"version": STconverter.VERSION,
+               "python": platform.python_version(),
+               "platform": platform.platform(),
+               "repeat": repeat,
+               "engine": engine,
+               "series": {}}
+
+    for name, elements in sorted(series.items()):
+        cases = []
+        for scale in scales:
+            params = dict(DEFAULT)
+            for element in elements:
+                params[element] = DEFAULT[element] * scale
+            case = run_case(params, repeat, engine)
+            case["scale"] = scale
+            cases.append(case)
+            print("{s:<10} x{k:<5} {l:>7} lines {t:>9.4f}s {c:>4} copies "
+                  "{b:>9.1f} KB copied  peak {p:.1f} KB ({f})".format(
+                      s=name, k=scale, l=case["lines"], t=case["time"],
+                      c=case["copies"], b=case["bytes_copied"] / 1024.0,
+                      p=case["peak_memory"] / 1024.0,
+                      f=case["peak_memory_found"]))
+        results["series"][name] = {"cases": cases, "scaling": scaling(cases)}
+        print("{s:<10} scaling: {k}".format(s=name,
+                  k="{0:.2f}".format(scaling(cases)) if scaling(cases) else "-"))
+
+    return results
+
+
+def compare(results, reference):
+    """ print the time ratio of each case of results to the same case (same
+        series and scale) of reference results """
+
+    print("{s:<10} {k:>6} {r:>10} {n:>10} {x:>7}".format(
+              s="series", k="scale", r="reference", n="new", x="ratio"))
+    for name, series in sorted(results["series"].items()):
+        old = reference["series"].get(name, {"cases": []})
+        old_cases = dict((case["scale"], case) for case in old["cases"])
+        for case in series["cases"]:
+            if case["scale"] not in old_cases:
+                continue
+            before = old_cases[case["scale"]]["time"]
+            print("{s:<10} {k:>6} {r:>10.4f} {n:>10.4f} {x:>7.2f}".format(
+                      s=name, k=case["scale"], r=before, n=case["time"],
+                      x=case["time"] / before if before else 0.0))
+
+
+
+# elements multiplied by the scale in each series
+SERIES = {
+"draws"   : ["draws"],
+"widgets" : ["buttons", "labels", "inputs"],
+"timers"  : ["timers"],
+"images"  : ["images"],
+"all"     : list(DEFAULT)
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of STconverter "
+                 "on generated SimpleGUI programs of increasing size.")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="multipliers of the number of elements "
+                             "(default: 1 2 4 8)")
+    parser.add_argument("--series", nargs="+", choices=sorted(SERIES),
+                        default=sorted(SERIES),
+                        help="series to run (default: all of them)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="conversions of each program, the best time is "
+                             "kept (default: 3)")
+    parser.add_argument("-o", "--output", help="JSON file of the results")
+    parser.add_argument("--compare", metavar="JSON",
+                        help="results of a previous run to compare with")
+    parser.add_argument("--pathological", action="store_true",
+                        help="convert the pathological programs instead, "
+                             "scaled by 1000 x each scale")
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="pathological: time budget of each conversion "
+                             "(default: 1s)")
+    parser.add_argument("--engine", choices=STconverter.ENGINES, default="regex",
+                        help="engine of the conversions (default: regex)")
+    args = parser.parse_args(argv)
+
+    if args.pathological:
+        results = run_pathological([1000 * scale for scale in sorted(args.scale)],
+                                   args.budget, args.engine)
+        if args.output:
+            with open(args.output, "w") as output:
+                json.dump({"version": STconverter.VERSION, "budget": args.budget,
+                           "engine": args.engine,
+                           "pathological": results}, output, indent=1,
+                          sort_keys=True)
+        stopped = [case for case in results
+                   if [r for r in results[case] if r["time"] is None]]
+        return 1 if stopped else 0
+
+    results = run(sorted(args.scale), args.repeat,
+                  dict((name, SERIES[name]) for name in args.series),
+                  args.engine)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as reference:
+            compare(results, json.load(reference))
+
+    return 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main())
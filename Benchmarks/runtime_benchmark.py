@@ -0,0 +1,322 @@
+#!/usr/bin/python
+
+# MIT License
+# Copyright (c) 2012 Jean-Etienne Morlighem <jem.nvnt@gmail.com>
+# https://github.com/jem-gh/STconverter
+
+###############################################################################
+# Micro-benchmark of the code added by STconverter to the converted programs:
+# a SimpleGUI program drawing sprites and shapes is converted, and the draw
+# methods of its STconverter_image class (the hot path of the programs drawing
+# images) and of its STconverter_canvas class (through which all drawings go)
+# are timed over many frames of sprites and shapes moving, rotating or
+# standing still.
+#
+# Usage (from the repository):
+#
+#   ./Benchmarks/runtime_benchmark.py --frames 1000 --sprites 20 --shapes 200
+#
+# PIL is replaced by stand-ins which only count the tiles made (each one being
+# a crop, a resize, a rotation and an upload of pixels to Tk in a real
+# program), and the Tkinter canvas by a canvas whose Tcl command only counts
+# the commands it is given (in a Tcl interpreter, without Tk), so that no
+# display is needed and only the cost of the converted code itself and of
+# its calls to Tcl is measured. The results can be compared with the ones of
+# a previous run (of a previous version of STconverter, for example):
+#
+#   ./Benchmarks/runtime_benchmark.py -o before.json
+#   ./Benchmarks/runtime_benchmark.py --compare before.json
+###############################################################################
+
+
+import os, sys
+import re
+import json
+import time
+import platform
+import argparse
+import collections
+try:
+    import Tkinter as tkinter
+except ImportError:
+    import tkinter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import STconverter
+
+
+
+# program drawing a sprite and shapes, converted to get the code of
+# STconverter_image and STconverter_canvas
+PROGRAM = """import simplegui
+sprite = simplegui.load_image('http://example.com/sprite.png')
+def draw(canvas):
+    canvas.draw_image(sprite, (32, 32), (64, 64), (100, 100), (64, 64), 0.5)
+    canvas.draw_circle((100, 100), 20, 2, 'Red', 'White')
+frame = simplegui.create_frame('Sprites', 400, 400)
+frame.set_draw_handler(draw)
+frame.start()
+"""
+
+
+class Stand_In_Image:
+    """ PIL image, only keeping its size """
+
+    BILINEAR = BICUBIC = 0
+
+    def __init__(self, size):
+        self.size = size
+
+    def crop(self, box):
+        return Stand_In_Image((box[2] - box[0], box[3] - box[1]))
+
+    def resize(self, size, resample=0):
+        return Stand_In_Image(size)
+
+    def rotate(self, angle, resample=0, expand=0):
+        return Stand_In_Image(self.size)
+
+
+class Stand_In_Photo:
+    """ ImageTk.PhotoImage, counting the tiles made """
+
+    made = 0
+
+    def __init__(self, image):
+        self.image = image
+        Stand_In_Photo.made += 1
+        self.name = "pyimage{n}".format(n=Stand_In_Photo.made)
+
+    def __str__(self):
+        return self.name
+
+    def width(self):
+        return self.image.size[0]
+
+    def height(self):
+        return self.image.size[1]
+
+
+# Tcl command of the stand-in canvas, counting the commands it is given and
+# returning a new identifier to each item created
+CANVAS_COMMAND = """
+proc .canvas {command args} {
+    incr ::commands($command)
+    if {$command eq "create"} {
+        return [incr ::items]
+    }
+}
+"""
+
+
+class Counting_Tcl:
+    """ Tcl interpreter, counting the calls made to it from Python """
+
+    def __init__(self, tk):
+        self.tk = tk
+        self.calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.tk, name)
+
+    def call(self, *args):
+        self.calls += 1
+        return self.tk.call(*args)
+
+    def eval(self, script):
+        self.calls += 1
+        return self.tk.eval(script)
+
+
+class Stand_In_Canvas(tkinter.Canvas):
+    """ Tkinter canvas (its methods turning the items into Tcl commands),
+        whose Tcl command only counts the commands it is given """
+
+    def __init__(self):
+        self.tk = Counting_Tcl(tkinter.Tcl().tk)
+        self._w = ".canvas"
+        self.tk.tk.eval(CANVAS_COMMAND)
+
+    def commands(self):
+        """ return the number of each command given to the canvas """
+
+        words = self.tk.splitlist(self.tk.tk.eval("array get commands"))
+        return dict((words[n], int(words[n + 1]))
+                    for n in range(0, len(words), 2))
+
+
+def program_classes():
+    """ return the STconverter_image and STconverter_canvas classes added to
+        the converted programs, and the canvas of the programs (the stand-in
+        of the Tkinter canvas, drawn through STconverter_canvas) """
+
+    # each class ends at the first line which is not indented
+    code = STconverter.convert(PROGRAM)
+    namespace = {"collections": collections,
+                 "Image": Stand_In_Image,
+                 "ImageTk": type("ImageTk", (), {"PhotoImage": Stand_In_Photo})}
+    for name in ("STconverter_image", "STconverter_canvas"):
+        source = re.search("(?m)^class {n}:\n(?:(?:[ \t].*)?\n)*".format(
+                               n=name), code).group()
+        exec(source, namespace)
+    namespace["canvas"] = namespace["STconverter_canvas"](Stand_In_Canvas())
+    return (namespace["STconverter_image"], namespace["STconverter_canvas"],
+            namespace["canvas"])
+
+
+def run(frames, sprites, repeat):
+    """ draw sprites during frames, repeat times: a third of the sprites move,
+        a third rotate (by steps of 10 degrees) and a third stand still.
+        Return the best time and the use of the tiles cache """
+
+    best = None
+    for r in range(repeat):
+        STconverter_image, STconverter_canvas, canvas = program_classes()
+        image = STconverter_image(Stand_In_Image((640, 640)))
+        Stand_In_Photo.made = 0
+
+        start = time.time()
+        for frame in range(frames):
+            canvas.begin_frame()
+            for n in range(sprites):
+                kind = n % 3
+                center = [32 + 64 * (n % 10), 32 + 64 * (n // 10 % 10)]
+                position = (frame % 400, n * 20) if kind == 0 else (100, n * 20)
+                angle = (frame % 36) * 0.1745 if kind == 1 else 0
+                image.draw(canvas, center, [64, 64], position, (64, 64), angle)
+            canvas.end_frame()
+        elapsed = time.time() - start
+
+        if best is None or elapsed < best["time"]:
+            best = {"time": elapsed,
+                    "hits": STconverter_image.hits,
+                    "misses": STconverter_image.misses,
+                    "evictions": STconverter_image.evictions,
+                    "tiles_made": Stand_In_Photo.made}
+
+    draws = frames * sprites
+    best.update({"frames": frames, "sprites": sprites, "draws": draws,
+                 "draws_per_second": draws / best["time"] if best["time"] else 0,
+                 "hit_rate": float(best["hits"]) / draws})
+    return best
+
+
+def run_shapes(frames, shapes, repeat):
+    """ draw shapes (lines, circles, polygons and texts, as converted from
+        SimpleGUI) during frames, repeat times: a tenth of the shapes move,
+        a tenth change color and the others stand still. Return the best
+        time, the calls made to Tcl and the commands given to the canvas """
+
+    best = None
+    for r in range(repeat):
+        STconverter_image, STconverter_canvas, canvas = program_classes()
+
+        start = time.time()
+        for frame in range(frames):
+            canvas.begin_frame()
+            for n in range(shapes):
+                x, y = 20 * (n % 20), 20 * (n // 20 % 20)
+                if n % 10 == 0:
+                    x += frame % 400
+                color = ("Red", "Blue")[frame % 2] if n % 10 == 1 else "White"
+                kind = n % 4
+                if kind == 0:
+                    canvas.create_line((x, y), (x + 10, y + 10), width=2,
+                                       fill=color)
+                elif kind == 1:
+                    canvas.create_oval(x - 5, y - 5, x + 5, y + 5, width=1,
+                                       outline=color, fill="Black")
+                elif kind == 2:
+                    canvas.create_polygon([(x, y), (x + 10, y), (x, y + 10)],
+                                          width=1, outline=color, fill="")
+                else:
+                    canvas.create_text((x, y), text=str(n), fill=color,
+                                       font=("Helvetica", 12), anchor="sw")
+            canvas.end_frame()
+        elapsed = time.time() - start
+
+        if best is None or elapsed < best["time"]:
+            best = {"time": elapsed, "tcl_calls": canvas.canvas.tk.calls,
+                    "commands": canvas.canvas.commands()}
+
+    draws = frames * shapes
+    best.update({"frames": frames, "shapes": shapes, "draws": draws,
+                 "draws_per_second": draws / best["time"] if best["time"] else 0,
+                 "tcl_calls_per_frame": float(best["tcl_calls"]) / frames,
+                 "commands_per_frame":
+                     float(sum(best["commands"].values())) / frames})
+    return best
+
+
+def compare(results, reference):
+    """ print the draws per second of each benchmark of results and of the
+        same benchmark of reference results, and their ratio """
+
+    print("{b:<12} {r:>12} {n:>12} {x:>7}".format(
+              b="benchmark", r="reference", n="new", x="ratio"))
+    for name, result in sorted(results.items()):
+        if name not in reference:
+            continue
+        before = reference[name]["draws_per_second"]
+        print("{b:<12} {r:>12.0f} {n:>12.0f} {x:>7.2f}".format(
+                  b=name, r=before, n=result["draws_per_second"],
+                  x=result["draws_per_second"] / before if before else 0.0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the "
+                 "drawing of images and shapes by the converted programs.")
+    parser.add_argument("--frames", type=int, default=1000,
+                        help="frames drawn (default: 1000)")
+    parser.add_argument("--sprites", type=int, default=20,
+                        help="sprites drawn in each frame (default: 20)")
+    parser.add_argument("--shapes", type=int, default=200,
+                        help="shapes drawn in each frame (default: 200)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs of the benchmark, the best time is kept "
+                             "(default: 3)")
+    parser.add_argument("-o", "--output", help="JSON file of the results")
+    parser.add_argument("--compare", metavar="JSON",
+                        help="results of a previous run to compare with")
+    args = parser.parse_args(argv)
+
+    result = run(args.frames, args.sprites, args.repeat)
+    print("draw_image: {d} draws in {t:.4f}s ({s:.0f} draws/s, {u:.2f} us "
+          "each)".format(d=result["draws"], t=result["time"],
+                         s=result["draws_per_second"],
+                         u=1e6 * result["time"] / result["draws"]))
+    print("tiles: {m} made, {h} hits ({r:.1%}), {e} evicted".format(
+              m=result["tiles_made"], h=result["hits"], r=result["hit_rate"],
+              e=result["evictions"]))
+
+    shapes = run_shapes(args.frames, args.shapes, args.repeat)
+    print("draw_shapes: {d} draws in {t:.4f}s ({s:.0f} shapes/s, {u:.2f} us "
+          "each)".format(d=shapes["draws"], t=shapes["time"],
+                         s=shapes["draws_per_second"],
+                         u=1e6 * shapes["time"] / shapes["draws"]))
+    print("canvas: {c:.1f} calls to Tcl and {m:.1f} commands per frame "
+          "({k})".format(c=shapes["tcl_calls_per_frame"],
+                         m=shapes["commands_per_frame"],
+                         k=", ".join("{n} {c}".format(n=n, c=c) for c, n
+                                     in sorted(shapes["commands"].items()))))
+
+    system = {"version": STconverter.VERSION,
+              "python": platform.python_version(),
+              "platform": platform.platform()}
+    result.update(system)
+    shapes.update(system)
+    results = {"draw_image": result, "draw_shapes": shapes}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as reference:
+            compare(results, json.load(reference))
+
+    return 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,47 +23,922 @@
 ###############################################################################
 
 
-# import global modules
+# import global modules (others are only imported when needed, to keep 
+# STconverter quick to import)
+import time
+IMPORT_START = time.time()
+
+import os, sys
 import re
-import urllib2      # used by up_music()
+import glob
+import collections
+import bisect
+import hashlib
+import signal
+
+# version of the converter
+VERSION = "1.1"
+
+def source_hash():
+    """ return a hash of the source of the converter, part of the key of the 
+        cached conversions: any change of the converter invalidates them """
+    
+    path = os.path.splitext(os.path.abspath(__file__))[0] + ".py"
+    try:
+        with open(path, "rb") as source:
+            return hashlib.sha1(source.read()).hexdigest()
+    except (IOError, OSError, NameError):
+        # source not available (frozen executable), fall back on the version 
+        return VERSION
+
+SOURCE_HASH = source_hash()
+
+# time budget of the conversion of a file (in seconds) in the GUI and in the 
+# command line (see Simplegui2Tkinter)
+TIME_BUDGET = 60
+
+# time given to each request of the size of a sound (in seconds), and number 
+# of threads sending these requests (see probe_assets)
+PROBE_TIMEOUT = 10
+PROBE_THREADS = 8
 
+# time during which the metadata of an asset are used without asking them 
+# again (in seconds, see Asset_Cache)
+ASSET_TTL = 24 * 60 * 60
+
+# directory of the assets downloaded for the converted programs, next to them 
+# (see Asset_Bundle)
+BUNDLE_DIR = "STconverter_assets"
+
+# maximum size of the cache of the files downloaded by the converted programs, 
+# in the user cache directory (in bytes, see up_assets)
+DOWNLOAD_CACHE_SIZE = 256 * 1024 * 1024
+
+# start of the file of a cached conversion depending on the metadata of 
+# assets, followed by their URLs (see Conversion_Cache)
+ASSETS_RECORD = "\0assets\0\n"
+
+# maximum size of the tiles of images kept by the converted programs, in bytes 
+# of pixels (see up_image), that they may change in STconverter_image.budget
+TILE_CACHE_SIZE = 32 * 1024 * 1024
+
+# frames drawn per second by the converted programs (see up_frame_canvas), 
+# that they may change in STconverter_frames.fps
+FPS = 60
+
+
+
+# blocks of the SimpleGUI elements' definitions below, each one matching a 
+# string in only one way, so that a definition which does not match a line is 
+# given up in linear time (instead of backtracking exponentially over a long 
+# list of arguments or an unbalanced line)
+BLOCKS = {
+    # QUOTED STRING
+"quoted"   : "\"[^\"\\n]*\"|'[^'\\n]*'", 
+    # PARENTHESES: arguments or tuple on one line, with parentheses inside
+"parens"   : "\((?:[^()\"'\\n]|{quoted}|\((?:[^()\"'\\n]|{quoted})*\))*\)", 
+    # BRACKETS: index without comma on one line, with brackets inside
+"brackets" : "\[[^,\[\]\\n]*(?:\[[^,\[\]\\n]*\][^,\[\]\\n]*)*\]", 
+    # POINTS: list or tuple of points, on one or several lines
+"points"   : "[\[\(]{point}*(?:[\[\(]{point}*(?:[\[\(]{point}*[\]\)]{point}*)*" \
+             "[\]\)]{point}*)*[\]\)]", 
+"point"    : "[\w\+\-\*\/\%\.\s,\\\\]", 
+    # OPERATION: digits, variables, lists, operators (parameters which may 
+    # have spaces inside, but never before or after them)
+"operation": "[\w\+\-\*\/\%\.\[\(\]\)]+", 
+    # TEXT: character of a text out of quotes, parentheses and brackets
+"text"     : "[\w\+\-\*\/\%\.\]\)]"
+}
+for name in ("parens", "points"):
+    BLOCKS[name] = BLOCKS[name].format(**BLOCKS)
 
 
 # SimpleGUI elements' definitions
 RNI = {
     # INDENTATION
-"I"  : "( *)", 
+"I"  : "(?<![\w ])( *)(?! )", 
     # NAME
-"N"  : "([\w\.]+)", 
+"N"  : "(?<![\w\.])([\w\.]+)", 
     # NAME OPTIONAL
-"No" : "(\w*?)", 
+"No" : "((?:\w+(?=[ =]))??)", 
     # CANVAS / FRAME
-"C"  : "(\w+)", 
+"C"  : "(?<!\w)(\w+)", 
     # FUNCTION
-"F"  : "([\w\.]+(?:\(.*\))?)", 
+"F"  : "([\w\.]+(?:{parens})?)", 
     # PARAMETER: digit, variable, list, operation
-"P"  : "([\w\+\-\*\/\%\.\[\(\]\) ]+)", 
+"P"  : "({operation}(?: +{operation})*)", 
     # PARAMETER COORDINATE: digit, variable, list, function, operation, tuple
-"Pc" : "([\w\.]+|[\w\.]+\(.*\)|[\w\.]+\[[^,]*\]|[\[\(][^,]+,[^,]+[\]\)])", 
+"Pc" : "([\w\.]+(?:{parens}|{brackets})?|[\[\(][^,]+,[^,]+[\]\)])", 
     # PARAMETER MULTILINE: digit, variable, list, function, operation, tuple, multiline
-"Pm" : "([\w\.]+|[\w\.]+\(.*\)|[\w\.]+\[[^,]*\]|[\[\(][\w\+\-\*\/\%\.\[\(\]\)\s,\\\\]+[\]\)])", 
+"Pm" : "([\w\.]+(?:{parens}|{brackets})?|{points})", 
     # PARAMETER QUOTED: variable, list, function, quoted string
-"Pq" : "([\"].*?[\"]|[\'].*?[\']|[\w\.]+\(.*\)|[\w\.]+\[[^,]+\]|[\w\+\-\*\/\%\.\[\(\]\) ]+)", 
+"Pq" : "([\"].*?[\"]|[\'].*?[\']|[\w\.]+{parens}|[\w\.]+{brackets}|{operation}(?: +{operation})*)", 
     # PARAMETER QUOTED TEXT: association of variable, list, quoted string
-"Pt" : "((?:[\"].*?[\"]|[\'].*?[\']|[\w\.]+\(.*\)|[\w\.]+\[[^,]+\]|[\w\+\-\*\/\%\.\[\(\]\) ]+)+)", 
-    # SPACE: comma, space, \n, \
-"S"  : "(?: *(?:,|\\\| )+\s*)", 
+"Pt" : "((?:{text}|{quoted}|{parens}|{brackets})" \
+       "(?: *(?:{text}|{quoted}|{parens}|{brackets}))*)", 
+    # SPACE: comma or \, with spaces and \n around
+"S"  : "(?: *[,\\\\][ ,\\\\]*(?![ ,\\\\])\s*)", 
     # COMMENT
 "M"  : "( *#?.*)"
 }
+for name in RNI:
+    RNI[name] = RNI[name].format(**BLOCKS)
+
+
+# SimpleGUI statements written with the elements' definitions above
+SG = {
+    # MODULE
+"import"   : "(import [\w ,]*)simplegui", 
+"head"     : "^((?:\s|(?:#.*\n))*)", 
+"imports"  : "(?m)^((?:import +.+\n)|(?:from +.+\n))", 
+    # FRAME / CANVAS
+"frame"    : "{I}{N} *= *simplegui.create_frame" \
+             "\( *{Pq}{S}{P}{S}{P}(?:{S}{P}?)? *\){M}", 
+"frame_tk" : "{N} = Tkinter.Frame\(", 
+"bg"       : "(?<!\w)\w+.set_canvas_background\( *{Pq} *\){M}", 
+"draw_h"   : "(?<!\w)\w+.set_draw_handler\( *{N} *\)", 
+    # CANVAS ITEMS
+"text"     : "{I}{No} *(?:= *)?{C}.draw_text\( *{Pt}{S}{Pc}{S}{P}{S}{Pq} *\)", 
+"circle"   : "{I}{No} *(?:= *)?{C}.draw_circle" \
+             "\( *{Pc}{S}{P}{S}{P}{S}{Pq}(?:{S}{Pq}?)? *\)", 
+"line"     : "{C}.draw_line\( *{Pc}{S}{Pc}{S}{P}{S}{Pq} *\)", 
+"polyline" : "{C}.draw_polyline\( *{Pm}{S}{P}{S}{Pq} *\)", 
+"polygon"  : "{C}.draw_polygon\( *{Pm}{S}{P}{S}{Pq}(?:{S}{Pq}?)? *\)", 
+"image"    : "{N}.draw_image\( *{N}{S}{Pc}{S}{Pc}{S}{Pc}{S}{Pc}(?:{S}{P}?)? *\){M}", 
+    # CONTROL PANEL
+"button"   : "{I}(?:\w+ *= *)?{C}.add_button\( *{Pt}{S}{N}(?:{S}{P}?)? *\){M}", 
+"label"    : "{I}{No} *(?:= *)?{C}.add_label\( *{Pt}(?:{S}{P}?)? *\)(?={M}\n)", 
+"input"    : "{I}{No} *(?:= *)?{C}.add_input\( *{Pt}{S}{N}{S}{P} *\){M}", 
+    # TIMER / SOUND / IMAGE
+"timer"    : "{I}{N} *= *simplegui.create_timer\( *{P}{S}{F} *\){M}", 
+"sound"    : "(?<!\w)(?! ){No} *(?:= *)?simplegui.load_sound\( *{Pt} *\)", 
+"sound_any": "simplegui.load_sound\((.*)\)", 
+"load_img" : "simplegui.load_image\( *{Pt} *\)", 
+    # KEYBOARD / MOUSE
+"keydown"  : "{I}{C}.set_keydown_handler\( *{N} *\){M}", 
+"keyup"    : "{I}{C}.set_keyup_handler\( *{N} *\){M}", 
+"key_map"  : "simplegui.KEY_MAP{S}?\[ *{Pq} *\]", 
+"click"    : "{C}.set_mouseclick_handler\( *{N} *\){M}", 
+"drag"     : "{C}.set_mousedrag_handler\( *{N} *\){M}", 
+    # PARAMETERS CONTENT
+"operation": "[a-zA-Z\+\-\*\/\%]", 
+"digit"    : "\d+", 
+"word"     : "\w+", 
+"var"      : "^\w+", 
+"list_sep" : " *, *\n? *", 
+    # TKINTER INCOMPATIBLE
+"aqua"     : "[\"\'][aA]qua[\"\']", 
+"fuchsia"  : "[\"\'][fF]uchsia[\"\']", 
+"lime"     : "[\"\'][lL]ime[\"\']", 
+"olive"    : "[\"\'][oO]live[\"\']", 
+"silver"   : "[\"\'][sS]ilver[\"\']", 
+"teal"     : "[\"\'][tT]eal[\"\']", 
+"docstring": '""""', 
+    # FEATURES: SimpleGUI functions and colors looked for before conversion
+"features" : "create_frame|set_draw_handler|Tkinter\.Frame|"
+             "draw_(?:text|circle|line|polyline|polygon|image)|"
+             "add_(?:button|label|input)|create_timer|load_sound|"
+             "set_(?:keydown|mouseclick|mousedrag)_handler|"
+             "[\"\'](?:[aA]qua|[fF]uchsia|[lL]ime|[oO]live|[sS]ilver|[tT]eal)[\"\']|"
+             '""""'
+}
+
+# every statement above is compiled only once, when STconverter is imported
+PATTERNS = dict((k, re.compile(v.format(**RNI))) for k, v in SG.items())
+
+# literal found in every match of a statement, on the line where the match 
+# starts (or the line after): the statement is only looked for around the 
+# lines with its literal (see Simplegui2Tkinter.candidates)
+LITERALS = {
+"frame"    : "create_frame", 
+"frame_tk" : "Tkinter.Frame(", 
+"bg"       : "set_canvas_background", 
+"draw_h"   : "set_draw_handler", 
+"text"     : "draw_text", 
+"circle"   : "draw_circle", 
+"line"     : "draw_line", 
+"polyline" : "draw_polyline", 
+"polygon"  : "draw_polygon", 
+"image"    : "draw_image", 
+"button"   : "add_button", 
+"label"    : "add_label", 
+"input"    : "add_input", 
+"timer"    : "create_timer", 
+"sound"    : "load_sound", 
+"sound_any": "load_sound", 
+"load_img" : "load_image", 
+"keydown"  : "set_keydown_handler", 
+"keyup"    : "set_keyup_handler", 
+"key_map"  : "KEY_MAP", 
+"click"    : "set_mouseclick_handler", 
+"drag"     : "set_mousedrag_handler"
+}
+
+# compiled statements with the literal on which they are anchored
+ANCHORS = dict((PATTERNS[name], literal) for name, literal in LITERALS.items())
+
+# hexadecimal values of the colors not always recognized by Tkinter
+COLORS = {
+"aqua"     : "'#00FFFF'", 
+"fuchsia"  : "'#FF00FF'", 
+"lime"     : "'#00FF00'", 
+"olive"    : "'#808000'", 
+"silver"   : "'#C0C0C0'", 
+"teal"     : "'#008080'"
+}
+
+# conversion passes in order of execution, each one with the features which 
+# need it: a pass is run only if one of its features is found in the input 
+# code (None: always run)
+PASSES = [
+("up_module",               None), 
+("up_frame_canvas",         ("create_frame", "set_draw_handler")), 
+("up_calls",                None), 
+("up_music",                ("load_sound",)), 
+("up_image",                ("draw_image",)), 
+("up_assets",               ("load_sound", "draw_image")), 
+("up_key",                  ("set_keydown_handler",)), 
+("up_mouse",                ("set_mouseclick_handler", "set_mousedrag_handler")), 
+("up_ini",                  ("create_frame", "Tkinter.Frame")), 
+("up_Tkinter_incompatible", tuple(COLORS) + ('""""',))
+]
+
+
+# engines of the conversion: "regex" runs the passes over the whole code, 
+# "token" tokenizes the code once (see TOKENS) and runs them only over the 
+# lines which they may convert (see Simplegui2Tkinter.find_regions)
+ENGINES = ("regex", "token")
+
+# SimpleGUI calls, whose arguments may be written on several lines (with the 
+# triggers of the rules added by register_rule)
+CALL_NAMES = set(("create_frame", "set_draw_handler", "set_canvas_background", 
+                  "draw_text", "draw_circle", "draw_line", "draw_polyline", 
+                  "draw_polygon", "draw_image", "add_button", "add_label", 
+                  "add_input", "create_timer", "load_sound", "load_image", 
+                  "set_keydown_handler", "set_keyup_handler", 
+                  "set_mouseclick_handler", "set_mousedrag_handler"))
+
+# names making a line a region of the token engine: the SimpleGUI calls and 
+# the other names that the passes look for or update (as patterns)
+REGION_NAMES = CALL_NAMES.union(("simplegui", "Tkinter", "import", 
+                                 "def", "start", "stop", "set_text", "chr", 
+                                 "play", "pause", "rewind", "set_volume"))
+
+# strings of the code: triple quoted (maybe on several lines) or single quoted
+STRING = r'"{3}[^"\\]*(?:(?:\\[\s\S]|"(?!""))[^"\\]*)*"{3}|' \
+         r"'{3}[^'\\]*(?:(?:\\[\s\S]|'(?!''))[^'\\]*)*'{3}|" \
+         r'"[^"\\\n]*(?:\\[\s\S][^"\\\n]*)*"|' \
+         r"'[^'\\\n]*(?:\\[\s\S][^'\\\n]*)*'"
+
+def tokens(names):
+    """ return the pattern of the tokens of the token engine, the rest of the 
+        code being skipped: strings (or a quote never closed), comments, 
+        names, brackets, line continuations and ends of lines """
+    
+    return "|".join(("(?P<string>[uUbB]?[rR]?(?:" + STRING + "))", 
+                     r"(?P<quote>[\"'])", 
+                     r"(?P<comment>#[^\n]*)", 
+                     r"(?P<name>(?<!\w)(?:" + "|".join(sorted(names)) + 
+                     r")(?!\w))", 
+                     r"(?P<open>[\(\[\{])", 
+                     r"(?P<close>[\)\]\}])", 
+                     r"(?P<continuation>\\\n)", 
+                     r"(?P<newline>\n)"))
+
+# tokens of the token engine, with the names of REGION_NAMES (rebuilt by 
+# register_rule)
+TOKENS = tokens(REGION_NAMES)
+
+# separator of the regions in the code converted by the token engine
+REGION_SEP = "\0\n"
+
+
+
+class Edit_Journal:
+    """ replacements of spans of a code, recorded as (start, end, text) and 
+        applied all at once: the code is copied a single time for all of them, 
+        instead of once for each re.sub. The spans are offsets in the code 
+        before any of the edits. The edits are applied when a pass reads the 
+        code, not only once at the end of the conversion: the patterns are 
+        matched in a single string, and some passes look for the code written 
+        by the previous ones (the Tkinter import, the Frame, the imports of 
+        the classes added to the converted code) """
+    
+    def __init__(self):
+        self.edits = []
+        self.starts = []
+        # change of the size of the code once the edits are applied
+        self.delta = 0
+    
+    
+    def touches(self, start, end):
+        """ whether a span overlaps an edited span or is next to it (the 
+            characters around a match are checked by lookbehinds/lookaheads) """
+        
+        i = bisect.bisect_left(self.starts, start)
+        return (i > 0 and self.edits[i - 1][1] >= start) or \
+               (i < len(self.edits) and self.edits[i][0] <= end)
+    
+    
+    def add(self, start, end, text):
+        """ record the replacement of a span of the code by text """
+        
+        i = bisect.bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.edits.insert(i, (start, end, text))
+        self.delta += len(text) - (end - start)
+    
+    
+    def apply(self, code):
+        """ return the code with all the edits, which are then cleared """
+        
+        parts = []
+        last = 0
+        for start, end, text in self.edits:
+            parts.append(code[last:start])
+            parts.append(text)
+            last = end
+        parts.append(code[last:])
+        
+        self.__init__()
+        return "".join(parts)
+
+
+
+class Pattern_Cache:
+    """ bounded LRU cache of the patterns compiled for a specific match (a 
+        name or an escaped parameter found in the input code), so that a large 
+        number of conversions does not purge the small cache of the re module """
+    
+    def __init__(self, size=512):
+        self.size = size
+        self.patterns = collections.OrderedDict()
+    
+    
+    def __call__(self, pattern, flags=0):
+        """ return the compiled pattern, compiling it if not in cache yet """
+        
+        compiled = self.patterns.pop((pattern, flags), None)
+        
+        if compiled is None:
+            compiled = re.compile(pattern, flags)
+            # drop the least recently used pattern if the cache is full
+            if len(self.patterns) >= self.size:
+                self.patterns.popitem(last=False)
+        
+        self.patterns[(pattern, flags)] = compiled
+        return compiled
+
+
+compile_re = Pattern_Cache()
+
+
+
+def probe_assets(urls, known=None, timeout=PROBE_TIMEOUT, threads=PROBE_THREADS):
+    """ return the metadata of the file of each URL as a dict (see 
+        probe_asset). The metadata are asked with HEAD requests (so that the 
+        files are not downloaded), sent in parallel by a pool of threads. The 
+        URLs of a host are shared between at most threads connections, each 
+        one kept alive for all its URLs. The requests of the URLs in known 
+        (URL: metadata asked before) are conditional, their metadata being 
+        kept if the file did not change. A request failing or taking more 
+        than timeout seconds raises IOError """
+    
+    from multiprocessing.pool import ThreadPool
+    try:
+        from urlparse import urlsplit
+    except ImportError:
+        from urllib.parse import urlsplit
+    
+    # the URLs of each host, dealt between its connections
+    hosts = collections.OrderedDict()
+    for url in urls:
+        hosts.setdefault(urlsplit(url)[:2], collections.OrderedDict())[url] = 0
+    jobs = []
+    for host_urls in hosts.values():
+        host_urls = list(host_urls)
+        count = min(threads, len(host_urls))
+        jobs.extend((host_urls[n::count], known or {}, timeout) 
+                    for n in range(count))
+    if not jobs:
+        return {}
+    
+    pool = ThreadPool(min(threads, len(jobs)))
+    try:
+        return dict(asset for assets in pool.map(probe_connection, jobs) 
+                          for asset in assets)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def probe_connection(job):
+    """ return the (URL, metadata) of the URLs of a job of probe_assets, asked 
+        in turn with the same connections (one for each host) """
+    
+    urls, known, timeout = job
+    connections = {}
+    try:
+        return [(url, probe_asset(url, connections, timeout, known.get(url))) 
+                for url in urls]
+    finally:
+        for connection in connections.values():
+            connection.close()
+
+
+def probe_asset(url, connections, timeout, entry=None):
+    """ return the metadata of the file of an URL asked with a HEAD request 
+        (following redirections) sent with connections, the open connection of 
+        each host: size (Content-Length, 0 if unknown), content type, ETag, 
+        Last-Modified and time of the request. If the metadata asked before 
+        are given as entry, the request is conditional and entry is returned, 
+        with the new time, if the file did not change """
+    
+    try:
+        import httplib
+        from urlparse import urlsplit, urljoin
+    except ImportError:
+        import http.client as httplib
+        from urllib.parse import urlsplit, urljoin
+    
+    headers = {}
+    if entry is not None and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry is not None and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    
+    for redirection in range(6):
+        scheme, host, path, query, fragment = urlsplit(url)
+        path = (path or "/") + ("?" + query if query else "")
+        method = "HEAD"
+        
+        for attempt in range(3):
+            reused = (scheme, host) in connections
+            if not reused:
+                connection_class = httplib.HTTPSConnection if scheme == "https" \
+                                   else httplib.HTTPConnection
+                connections[scheme, host] = connection_class(host, 
+                                                             timeout=timeout)
+            connection = connections[scheme, host]
+            try:
+                connection.request(method, path, headers=headers)
+                response = connection.getresponse()
+                if method == "HEAD":
+                    response.read()
+            except (httplib.HTTPException, IOError) as error:
+                connection.close()
+                del connections[scheme, host]
+                # a kept alive connection may have been closed by the server
+                if reused:
+                    continue
+                raise IOError("cannot get the size of {u}: {e!r}".format(
+                                  u=url, e=error))
+            
+            # some servers do not accept HEAD: the headers of a GET are read, 
+            # and its connection closed instead of downloading the file
+            if method == "HEAD" and response.status in (405, 501):
+                method = "GET"
+                continue
+            if method == "GET":
+                connection.close()
+                del connections[scheme, host]
+            break
+        else:
+            raise IOError("cannot get the size of {u}".format(u=url))
+        
+        location = response.getheader("Location")
+        if response.status in (301, 302, 303, 307, 308) and location:
+            url = urljoin(url, location)
+            continue
+        if response.status == 304 and entry is not None:
+            return dict(entry, fetched=time.time())
+        if response.status >= 400:
+            raise IOError("cannot get the size of {u}: HTTP {s} {r}".format(
+                              u=url, s=response.status, r=response.reason))
+        
+        length = response.getheader("Content-Length") or ""
+        return {"size": int(length) if length.isdigit() else 0, 
+                "content_type": response.getheader("Content-Type"), 
+                "etag": response.getheader("ETag"), 
+                "last_modified": response.getheader("Last-Modified"), 
+                "fetched": time.time()}
+    
+    raise IOError("too many redirections from {u}".format(u=url))
+
+
+
+def lock_directory(directory):
+    """ lock a directory shared with other processes (on Unix only), which 
+        wait until the lock file returned is closed. Return None if locks are 
+        not available """
+    
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    
+    lock = open(os.path.join(directory, "lock"), "a")
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+
+
+class Asset_Cache:
+    """ cache of the metadata of the assets of the programs (the files of the 
+        sounds and images), keyed by URL (see probe_asset). An entry older 
+        than ttl seconds is revalidated with a conditional request. With a 
+        directory, the entries are kept on disk and shared by the processes 
+        using it, so that each URL is asked to the network only once """
+    
+    def __init__(self, directory=None, ttl=ASSET_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        
+        # entries read or asked by this process
+        self.entries = {}
+        
+        self.hits = 0
+        self.requests = 0
+        self.revalidations = 0
+        
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+    
+    
+    def path(self, url):
+        """ return the path of the file of the entry of an URL """
+        
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key + ".json")
+    
+    
+    def fresh(self, entry):
+        """ whether an entry may be used without asking the network again """
+        
+        return entry is not None and 0 <= time.time() - entry["fetched"] < self.ttl
+    
+    
+    def load(self, url):
+        """ return the entry of an URL stored on disk, or None """
+        
+        import json
+        
+        if not self.directory:
+            return None
+        try:
+            with open(self.path(url)) as cached:
+                return json.load(cached)
+        except (IOError, OSError, ValueError):
+            return None
+    
+    
+    def store(self, url, entry):
+        """ keep the entry of an URL, on disk too if the cache has a directory """
+        
+        import json
+        
+        self.entries[url] = entry
+        if not self.directory:
+            return
+        
+        path = self.path(url)
+        if not os.path.isdir(os.path.dirname(path)):
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError:
+                # created meanwhile by another process
+                pass
+        
+        # write then rename, so that another process never reads half a file
+        temp = "{p}.{pid}.tmp".format(p=path, pid=os.getpid())
+        with open(temp, "w") as cached:
+            json.dump(entry, cached)
+        os.rename(temp, path)
+    
+    
+    def get(self, urls):
+        """ return the metadata of each URL as a dict, asking the network only 
+            for the URLs not in cache or whose entry is older than ttl. A 
+            request failing raises IOError (see probe_assets) """
+        
+        assets = {}
+        stale = collections.OrderedDict()
+        for url in urls:
+            if url in assets or url in stale:
+                continue
+            entry = self.entries.get(url)
+            if not self.fresh(entry):
+                entry = self.load(url) or entry
+            if self.fresh(entry):
+                self.entries[url] = assets[url] = entry
+                self.hits += 1
+            else:
+                stale[url] = entry
+        if not stale:
+            return assets
+        
+        lock = lock_directory(self.directory) if self.directory else None
+        try:
+            # the entries may have been asked meanwhile by another process
+            for url in list(stale):
+                entry = self.load(url) or stale[url]
+                if self.fresh(entry):
+                    self.entries[url] = assets[url] = entry
+                    self.hits += 1
+                    del stale[url]
+                else:
+                    stale[url] = entry
+            
+            known = dict((url, entry) for url, entry in stale.items() if entry)
+            for url, entry in probe_assets(list(stale), known).items():
+                self.store(url, entry)
+                assets[url] = entry
+            self.requests += len(stale)
+            self.revalidations += len(known)
+        finally:
+            if lock is not None:
+                # closing the file releases the lock
+                lock.close()
+        
+        return assets
+
+
+
+def bundle_name(url):
+    """ return the name of the file of an asset in a bundle directory (the 
+        same name is computed by STconverter_asset in the converted code) """
+    
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + \
+           os.path.splitext(url.split("?")[0])[1][:8]
+
+
+def find_asset_urls(code):
+    """ return the URLs of the assets loaded by a converted code with 
+        STconverter_asset: the URL given as a string, or the strings assigned 
+        to the variable (or list) given """
+    
+    import ast
+    
+    urls = []
+    for argument in compile_re("(?<!def )STconverter_asset\(" 
+                               "((?:[^()\n]|\([^()\n]*\))*)\)").findall(code):
+        argument = argument.strip()
+        if re.match("(?:{s})$".format(s=STRING), argument):
+            literals = [argument]
+        else:
+            name = re.match("[\w\.]+", argument)
+            if name is None:
+                continue
+            values = compile_re("(?m)^[ \t]*{n} *= *(\[[^\]]*\]|\([^\)]*\)|{s})"
+                                .format(n=re.escape(name.group()), s=STRING), 
+                                ).findall(code)
+            literals = [literal for value in values 
+                                for literal in re.findall(STRING, value)]
+        
+        for literal in literals:
+            try:
+                url = ast.literal_eval(literal)
+            except (ValueError, SyntaxError):
+                continue
+            if "://" in url and url not in urls:
+                urls.append(url)
+    
+    return urls
+
+
+def fetch_asset(job):
+    """ download the file of an URL of a job of Asset_Bundle.add to a path, 
+        with a conditional request if the metadata of the file downloaded 
+        before are given. Return the URL and its new metadata (see 
+        Asset_Bundle), or the URL and an error message """
+    
+    try:
+        from urllib2 import urlopen, Request, HTTPError
+    except ImportError:
+        from urllib.request import urlopen, Request
+        from urllib.error import HTTPError
+    
+    url, path, entry, timeout = job
+    request = Request(url)
+    if entry is not None and entry.get("etag"):
+        request.add_header("If-None-Match", entry["etag"])
+    if entry is not None and entry.get("last_modified"):
+        request.add_header("If-Modified-Since", entry["last_modified"])
+    
+    # write then rename, so that a program never loads half a file
+    temp = "{p}.{pid}.tmp".format(p=path, pid=os.getpid())
+    digest = hashlib.sha1()
+    size = 0
+    try:
+        response = urlopen(request, timeout=timeout)
+        try:
+            with open(temp, "wb") as asset:
+                for data in iter(lambda: response.read(64 * 1024), b""):
+                    digest.update(data)
+                    asset.write(data)
+                    size += len(data)
+            headers = response.info()
+        finally:
+            response.close()
+        os.rename(temp, path)
+    except HTTPError as error:
+        if error.code == 304 and entry is not None:
+            return url, dict(entry, fetched=time.time())
+        return url, "cannot download {u}: HTTP {c}".format(u=url, c=error.code)
+    except (IOError, OSError) as error:
+        if os.path.exists(temp):
+            os.remove(temp)
+        return url, "cannot download {u}: {e!r}".format(u=url, e=error)
+    
+    return url, {"file": os.path.basename(path), "size": size, 
+                 "sha1": digest.hexdigest(), 
+                 "content_type": headers.get("Content-Type"), 
+                 "etag": headers.get("ETag"), 
+                 "last_modified": headers.get("Last-Modified"), 
+                 "fetched": time.time()}
+
+
+
+class Asset_Bundle:
+    """ directory of the assets of converted programs (the files of their 
+        sounds and images), downloaded at conversion time so that the programs 
+        load them from disk instead of the network (see up_assets). Its 
+        manifest records the file of each URL with its size, sha1 hash, ETag 
+        and Last-Modified: an asset already downloaded is checked again, with 
+        a conditional request, only once older than ttl seconds. The 
+        directory may be shared by several processes """
+    
+    def __init__(self, directory, ttl=ASSET_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        
+        self.downloads = 0
+        self.unchanged = 0
+        
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # created meanwhile by another process
+                pass
+    
+    
+    def load(self):
+        """ return the manifest of the bundle (URL: metadata of its file) """
+        
+        import json
+        
+        try:
+            with open(os.path.join(self.directory, "manifest.json")) as manifest:
+                return json.load(manifest)
+        except (IOError, OSError, ValueError):
+            return {}
+    
+    
+    def save(self, manifest):
+        """ write the manifest of the bundle """
+        
+        import json
+        
+        path = os.path.join(self.directory, "manifest.json")
+        temp = "{p}.{pid}.tmp".format(p=path, pid=os.getpid())
+        with open(temp, "w") as saved:
+            json.dump(manifest, saved, indent=1, sort_keys=True)
+        os.rename(temp, path)
+    
+    
+    def add(self, urls, timeout=PROBE_TIMEOUT, threads=PROBE_THREADS):
+        """ download in parallel the assets of urls which are not in the bundle 
+            yet, or which changed since they were downloaded. A download 
+            failing raises IOError, the other assets being kept """
+        
+        from multiprocessing.pool import ThreadPool
+        
+        lock = lock_directory(self.directory)
+        try:
+            manifest = self.load()
+            
+            jobs = []
+            for url in collections.OrderedDict.fromkeys(urls):
+                entry = manifest.get(url)
+                path = os.path.join(self.directory, bundle_name(url))
+                # a file removed or truncated is downloaded again
+                if entry is not None and not (os.path.isfile(path) and 
+                                              os.path.getsize(path) == entry["size"]):
+                    entry = None
+                if entry is not None and 0 <= time.time() - entry["fetched"] < self.ttl:
+                    self.unchanged += 1
+                    continue
+                jobs.append((url, path, entry, timeout))
+            if not jobs:
+                return
+            
+            pool = ThreadPool(min(threads, len(jobs)))
+            try:
+                fetched = pool.map(fetch_asset, jobs)
+            finally:
+                pool.close()
+                pool.join()
+            
+            errors = []
+            for (url, path, entry, timeout), (url, result) in zip(jobs, fetched):
+                if not isinstance(result, dict):
+                    errors.append(result)
+                    continue
+                if entry is not None and entry["sha1"] == result["sha1"]:
+                    self.unchanged += 1
+                else:
+                    self.downloads += 1
+                manifest[url] = result
+            self.save(manifest)
+        finally:
+            if lock is not None:
+                lock.close()
+        
+        if errors:
+            raise IOError("; ".join(errors))
+
+
+
+class ConversionTimeout(Exception):
+    """ raised when a conversion takes longer than its time budget """
 
 
 
 class Simplegui2Tkinter:
     """ update SimpleGUI parts to Tkinter """
     
-    def __init__(self, code_input):
-        self.code = code_input
+    def __init__(self, code_input, profiler=None, time_budget=None, 
+                 engine="regex", assets=None, bundle=False, fps=FPS, 
+                 idle_fps=None):
+        if engine not in ENGINES:
+            raise ValueError("unknown engine: {e}".format(e=engine))
+        if not fps > 0 or not (idle_fps is None or idle_fps > 0):
+            raise ValueError("invalid frame rate: {f}".format(
+                                 f=fps if not fps > 0 else idle_fps))
+        
+        self.reset(code_input)
+        
+        # with the token engine, the code is replaced during the conversion by 
+        # its regions (see find_regions), the rest of the code being kept in 
+        # gaps: gaps[i] is the code between the regions i and i + 1
+        self.engine = engine
+        self.source = code_input
+        
+        # maximum time of the conversion in seconds, checked after each pass 
+        # and, in the main thread on Unix, enforced by an alarm signal which 
+        # stops even a pass which hangs (see start_alarm)
+        self.time_budget = time_budget
+        self.start = None
+        
+        # statistics of each pass run (see run_pass), also given to the 
+        # profiler function, if any, as soon as a pass is finished
+        self.profile = []
+        self.profiler = profiler
+        self.stats = {"regex": 0, "matches": 0, "copies": 0, "bytes_copied": 0}
+        
+        # metadata of the sounds and images used by the code, asked to the 
+        # network only if not in this cache (see Asset_Cache)
+        self.assets = assets if assets is not None else Asset_Cache()
+        
+        # whether the assets are loaded from the bundle directory next to the 
+        # converted program (see up_assets)
+        self.bundle = bundle
+        
+        # frames drawn per second by the converted program, and while its 
+        # canvas does not change if idle_fps is given (see up_frame_canvas)
+        self.fps = fps
+        self.idle_fps = idle_fps
+    
+    
+    def reset(self, code):
+        """ set the state of a conversion of code by the passes, at the start 
+            and when the token engine converts the code again as a whole """
+        
+        self.code = code
+        self.features = set()
+        self.passes = []
+        self.gaps = None
+        
+        # replacements of the passes using edit, not applied to the code yet
+        self.journal = Edit_Journal()
+        
+        # modules imported (and other imports) at the top of the converted 
+        # code for the code added by the passes (see add_imports)
+        self.modules = []
+        self.imports = []
+        
+        # matches found by each rule of up_calls (and by its replacement)
+        self.calls = collections.defaultdict(list)
+        
+        # index of the spans of the code around each literal looked for (see 
+        # candidates), valid as long as the code is index_code
+        self.index = {}
+        self.index_code = None
+        
+        # metadata of the assets changing the converted code (the sizes of the 
+        # sounds, see up_music), part of the key of its cached conversion
+        self.assets_used = {}
     
     
     def convert(self):
@@ -73,417 +948,988 @@ class Simplegui2Tkinter:
         if not "simplegui" in self.code:
             return "___NoSimpleguiFound!___"
         
-        self.up_module()
-        self.up_frame_canvas()
-        self.up_canvas_text()
-        self.up_canvas_oval()
-        self.up_canvas_line()
-        self.up_canvas_polyline()
-        self.up_canvas_polygon()
-        self.up_button()
-        self.up_label()
-        self.up_input()
-        self.up_timer()
-        self.up_music()
-        self.up_image()
-        self.up_key()
-        self.up_mouse()
-        self.up_ini()
-        self.up_Tkinter_incompatible()
+        self.start = time.time()
+        handler = self.start_alarm()
+        try:
+            if self.engine == "token":
+                self.run_pass("find_regions")
+            self.run_passes()
+            if self.gaps is not None:
+                self.run_pass("splice_regions")
+                # regions which could not be put back in the code are converted 
+                # again as a whole
+                if self.gaps is None:
+                    self.run_passes()
+        finally:
+            self.stop_alarm(handler)
         
         # return converted code
         return self.code
     
     
+    def run_passes(self):
+        """ run only the passes needed by the features used in the code """
+        
+        self.run_pass("find_features")
+        for name, features in PASSES:
+            if features is None or self.features.intersection(features):
+                self.passes.append(name)
+                self.run_pass(name)
+        
+        # the edits of the last passes are applied once, at the end
+        if self.journal.edits:
+            self.run_pass("apply_edits")
+    
+    
+    def run_pass(self, name):
+        """ run a pass and record its wall time, number of regex operations, 
+            matches found, copies of the code made (and their size), and size 
+            of the code before and after the pass """
+        
+        self.stats = {"pass": name, "regex": 0, "matches": 0, "copies": 0, 
+                      "bytes_copied": 0, 
+                      "bytes_in": len(self.code) + self.journal.delta}
+        
+        start = time.time()
+        getattr(self, name)()
+        self.stats["time"] = time.time() - start
+        self.stats["bytes_out"] = len(self.code) + self.journal.delta
+        
+        self.profile.append(self.stats)
+        if self.profiler is not None:
+            self.profiler(self.stats)
+        
+        if self.time_budget is not None and \
+           time.time() - self.start > self.time_budget:
+            self.timeout()
+    
+    
+    def start_alarm(self):
+        """ if the conversion has a time budget, set an alarm signal raising 
+            ConversionTimeout at the end of the budget, and return the 
+            previous handler of the signal. Signals are only available on Unix 
+            and in the main thread, elsewhere the time budget is only checked 
+            after each pass """
+        
+        if self.time_budget is None or not hasattr(signal, "setitimer"):
+            return None
+        
+        try:
+            handler = signal.signal(signal.SIGALRM, self.timeout)
+        except ValueError:
+            return None
+        signal.setitimer(signal.ITIMER_REAL, self.time_budget)
+        return handler
+    
+    
+    def stop_alarm(self, handler):
+        """ cancel the alarm set by start_alarm and restore the handler """
+        
+        if handler is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, handler)
+    
+    
+    def timeout(self, *signal_info):
+        """ stop the conversion with a diagnostic of where it was stopped """
+        
+        raise ConversionTimeout("time budget of {b}s exceeded after {t:.2f}s "
+                  "in pass {p} (code of {l} lines, {k:.1f} KB)".format(
+                      b=self.time_budget, t=time.time() - self.start, 
+                      p=self.stats.get("pass"), l=self.code.count("\n") + 1, 
+                      k=len(self.code) / 1024.0))
+    
+    
+    def candidates(self, literal):
+        """ return the spans of the code where a statement anchored on literal 
+            may be found: from the end of the line before each line with the 
+            literal to the end of its logical line (the statement may continue 
+            on the next lines, within brackets). The spans of each literal are 
+            found once for each version of the code """
+        
+        if self.index_code is not self.code:
+            self.index, self.index_code = {}, self.code
+        if literal in self.index:
+            return self.index[literal]
+        
+        code = self.code
+        spans = []
+        found = code.find(literal)
+        while found >= 0:
+            start = code.rfind("\n", 0, found) + 1
+            
+            # end of the logical line, after the brackets opened on the line
+            end, depth = len(code), 0
+            for token in compile_re(TOKENS).finditer(code, start):
+                kind = token.lastgroup
+                if kind == "open":
+                    depth += 1
+                elif kind == "close":
+                    depth -= 1
+                elif kind == "newline" and depth <= 0:
+                    end = token.end()
+                    break
+            
+            start = max(start - 1, 0)
+            if spans and spans[-1][1] >= start:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+            else:
+                spans.append((start, end))
+            found = code.find(literal, max(end, found + 1))
+        
+        self.index[literal] = spans
+        return spans
+    
+    
+    def finditer(self, pattern, anchor=None):
+        """ return the matches of a compiled pattern in the code, only looked 
+            for in the candidate spans of its literal if it is anchored on one 
+            (given, or in ANCHORS) """
+        
+        anchor = anchor or ANCHORS.get(pattern)
+        if anchor is None:
+            return list(pattern.finditer(self.code))
+        
+        return [match for start, end in self.candidates(anchor)
+                      for match in pattern.finditer(self.code, start, end)]
+    
+    
+    def sub(self, pattern, repl, anchor=None):
+        """ replace the matches of a compiled pattern in the code """
+        
+        self.apply_edits()
+        
+        if anchor is None and pattern not in ANCHORS:
+            self.code, count = pattern.subn(repl, self.code)
+            self.stats["regex"] += 1
+            self.stats["matches"] += count
+            if count:
+                self.stats["copies"] += 1
+                self.stats["bytes_copied"] += len(self.code)
+            return
+        
+        # replacements of the candidate spans, put in the code in one copy
+        matches = self.finditer(pattern, anchor)
+        self.stats["regex"] += 1
+        self.stats["matches"] += len(matches)
+        for match in matches:
+            self.journal.add(match.start(), match.end(), 
+                             repl(match) if callable(repl) else match.expand(repl))
+        self.apply_edits()
+    
+    
+    def edit(self, pattern, repl, anchor=None):
+        """ like sub, but the replacements are only recorded in the journal, 
+            and applied to the code with the next operation reading it (or at 
+            the end of the conversion), so that the edits of several passes 
+            cost a single copy of the code. A pass may use it only if its 
+            pattern never matches the code written by the other passes using 
+            it, and if it only checks in self.code names that it converts """
+        
+        matches = self.finditer(pattern, anchor)
+        self.stats["regex"] += 1
+        self.stats["matches"] += len(matches)
+        
+        # a match next to a pending edit may differ once the edit is applied
+        if [m for m in matches if self.journal.touches(m.start(), m.end())]:
+            self.stats["regex"] -= 1
+            self.stats["matches"] -= len(matches)
+            self.sub(pattern, repl, anchor)
+            return
+        
+        for match in matches:
+            self.journal.add(match.start(), match.end(), 
+                             repl(match) if callable(repl) else match.expand(repl))
+    
+    
+    def apply_edits(self):
+        """ apply the edits of the journal to the code, in a single copy """
+        
+        if self.journal.edits:
+            self.code = self.journal.apply(self.code)
+            self.stats["copies"] += 1
+            self.stats["bytes_copied"] += len(self.code)
+    
+    
+    def findall(self, pattern, string=None, anchor=None):
+        """ return the matches of a compiled pattern in the code (or string) """
+        
+        if string is not None:
+            found = pattern.findall(string)
+        elif anchor is None and pattern not in ANCHORS:
+            self.apply_edits()
+            found = pattern.findall(self.code)
+        else:
+            # same results as findall: the groups of each match, if any
+            self.apply_edits()
+            found = [match.group() if not pattern.groups else 
+                     match.group(1) or "" if pattern.groups == 1 else 
+                     match.groups("") 
+                     for match in self.finditer(pattern, anchor)]
+        self.stats["regex"] += 1
+        self.stats["matches"] += len(found)
+        return found
+    
+    
+    def search(self, pattern, string):
+        """ return the first match of a compiled pattern in string """
+        
+        found = pattern.search(string)
+        self.stats["regex"] += 1
+        self.stats["matches"] += 1 if found else 0
+        return found
+    
+    
+    def find_features(self):
+        """ find in a single scan the SimpleGUI functions and the colors used 
+            in the input code, return them as a set (also kept in features) """
+        
+        for feature in self.findall(PATTERNS["features"]):
+            # colors are recorded without quotes, in lower case
+            if feature[0] in "\"'" and feature != '""""':
+                feature = feature[1:-1].lower()
+            self.features.add(feature)
+        
+        return self.features
+    
+    
+    def find_regions(self):
+        """ token engine: scan the code once with TOKENS to find its regions, 
+            the logical lines that the passes may convert (using a name of 
+            REGION_NAMES or a string, or with a comment mentioning one of 
+            these names) and the head of the code (comments and blank lines). 
+            The code is then replaced by its regions separated by REGION_SEP, 
+            so that the passes neither scan nor copy the rest of it. Comments 
+            inside SimpleGUI calls written on several lines are removed """
+        
+        if REGION_SEP[0] in self.code:
+            return
+        
+        code = self.code
+        names = compile_re("|".join(sorted(REGION_NAMES)))
+        head = compile_re(r"(?:[ \t]*(?:#[^\n]*)?\n)*").match(code).group()
+        rows = set(range(head.count("\n")))
+        comments = []
+        
+        # row and start of the line being read, depth of brackets, and first 
+        # row of the logical line being read, whether it is a region, whether 
+        # it has a SimpleGUI call, and its comments
+        row, start, depth = 0, 0, 0
+        first, region, call, notes = 0, False, False, []
+        
+        for token in compile_re(TOKENS).finditer(code):
+            kind = token.lastgroup
+            
+            if kind == "newline" and depth == 0:
+                if region:
+                    rows.update(range(first, row + 1))
+                if call:
+                    comments.extend(note for note in notes if note[0] < row)
+                first, region, call, notes = row + 1, False, False, []
+            
+            if kind in ("newline", "continuation"):
+                row, start = row + 1, token.end()
+            elif kind == "open":
+                depth += 1
+            elif kind == "close":
+                depth = max(depth - 1, 0)
+            elif kind == "comment":
+                notes.append((row, token.start(), token.end()))
+                region = region or bool(names.search(token.group()))
+            elif kind == "string" and "\n" in token.group():
+                row += token.group().count("\n")
+                start = token.start() + token.group().rindex("\n") + 1
+                region = True
+            else:
+                region = True
+                call = call or token.group() in CALL_NAMES
+        
+        # last line, without end of line
+        if region:
+            rows.update(range(first, row + 1))
+        
+        # regions as ranges of rows, the first one at the start of the code and 
+        # the last one at its end (even if empty)
+        lines = code.splitlines(True)
+        ranges = [[0, 0]]
+        for row in sorted(rows):
+            if row >= len(lines):
+                break
+            if ranges[-1][1] == row:
+                ranges[-1][1] = row + 1
+            else:
+                ranges.append([row, row + 1])
+        if ranges[-1][1] < len(lines):
+            ranges.append([len(lines), len(lines)])
+        
+        # removal of the comments, from the end of each line
+        regions = lines[:]
+        offsets = [0]
+        for line in lines:
+            offsets.append(offsets[-1] + len(line))
+        for row, begin, end in reversed(comments):
+            begin, end = begin - offsets[row], end - offsets[row]
+            regions[row] = regions[row][:begin] + regions[row][end:]
+        
+        self.gaps = ["".join(lines[b:c]) for (a, b), (c, d) in 
+                                            zip(ranges, ranges[1:])]
+        self.code = REGION_SEP.join("".join(regions[a:b]) for a, b in ranges)
+    
+    
+    def splice_regions(self):
+        """ token engine: put the converted regions back between the gaps of 
+            the code. If the number of regions changed (a pass matched across 
+            two of them), the code is restored to be converted as a whole """
+        
+        regions = self.code.split(REGION_SEP)
+        
+        if len(regions) != len(self.gaps) + 1:
+            self.reset(self.source)
+            return
+        
+        self.code = "".join(code for pair in zip(regions, self.gaps + [""]) 
+                                 for code in pair)
+    
+    
+    def add_imports(self, modules, code=""):
+        """ import modules (and add code importing others) at the top level of 
+            the converted code, just after the import of division, in a 
+            single statement for all the passes: the code added after the 
+            imports (see add_after_imports) may then use them, even when 
+            Tkinter is imported in a block """
+        
+        old = self.imports_code()
+        for module in modules:
+            if module not in self.modules:
+                self.modules.append(module)
+        if code and code not in self.imports:
+            self.imports.append(code)
+        
+        self.sub(compile_re("^((?:\\s|(?:#.*\n))*\nfrom __future__ import " 
+                            "division\n)" + re.escape(old)), 
+                 lambda match: match.group(1) + self.imports_code())
+    
+    
+    def imports_code(self):
+        """ return the imports added by add_imports """
+        
+        code = "".join(self.imports)
+        if self.modules:
+            code = "import {m}\n".format(m=", ".join(self.modules)) + code
+        return code
+    
+    
+    def add_after_imports(self, code):
+        """ insert code just after the last module imported """
+        
+        last = self.findall(PATTERNS["imports"])[-1]
+        self.edit(compile_re(re.escape(last)), 
+                  lambda match: "{m}\n".format(m=last) + code, anchor=last)
+    
+    
     def up_module(self):
         """ update simplegui module to Tkinter and add division from future """
         
         # update simplegui module to Tkinter
-        self.code = re.sub("(import [\w ,]*)simplegui", 
-                           "\\1Tkinter", 
-                           self.code)
+        self.sub(PATTERNS["import"], "\\1Tkinter")
         
         # add division from future to enable true division in Python 2.7
-        self.code = re.sub("^((?:\s|(?:#.*\n))*)", 
-                           "\\1\nfrom __future__ import division\n\n", 
-                           self.code)
+        self.sub(PATTERNS["head"], "\\1\nfrom __future__ import division\n\n")
     
     
     def up_frame_canvas(self):
         """ update the Frame and Canvas widget """
         
-        sg_frame = "{I}{N} *= *simplegui.create_frame" \
-                   "\( *{Pq}{S}{P}{S}{P}{S}?{P}? *\){M}".\
-                   format(I=RNI["I"], N=RNI["N"], Pq=RNI["Pq"], 
-                          S=RNI["S"], P=RNI["P"], M=RNI["M"])
         tk_frame = "\\1window_root = Tkinter.Tk()\\7\n" \
                    "\\1window_root.title(\\3)\n" \
                    "\\1\\2 = Tkinter.Frame(window_root)\n" \
                    "\\1\\2.pack()\n"
         
-        tk_canvas = "\\1canvas = Tkinter.Canvas(\\2, width=\\4, height=\\5)\n" \
+        tk_canvas = "\\1canvas = STconverter_canvas(Tkinter.Canvas(\\2, " \
+                    "width=\\4, height=\\5))\n" \
                     "\\1canvas.pack(side='right')\n"
         
-        sg_bg = "\w+.set_canvas_background\( *{Pq} *\){M}".\
-                format(Pq=RNI["Pq"], M=RNI["M"])
         tk_bg = "\\1canvas.configure(background={b}){m}\n"
         
-        FRAME_RE = re.compile(sg_frame)
-        
         # if no need for Canvas widget, update only the Frame
         if "set_draw_handler" not in self.code:
-            self.code = FRAME_RE.sub(tk_frame, self.code)
+            self.sub(PATTERNS["frame"], tk_frame)
             return
         
         
-        # update drawing handler
-        sg_drawing_handler = "{I}def {n}\( *{N} *\):\n"
-        tk_drawing_handler = "\\1def {n}(\\2):\n" \
-                             "\\1    \\2.delete('all')\n" \
-                             "\\1    \n"
-        
-        draw_n = re.findall('\w+.set_draw_handler\( *{N} *\)'.format(N=RNI["N"]), 
-                            self.code)[0]
-        self.code = re.sub(sg_drawing_handler.format(I=RNI["I"], n=draw_n, 
-                               N=RNI["N"]), 
-                           tk_drawing_handler.format(n=draw_n), 
-                           self.code)
+        # Class added to the converted file to draw on the canvas in retained 
+        # mode: the items of a frame are kept for the next one, instead of 
+        # deleting all items and creating them again at each frame. The items 
+        # drawn are matched with the ones of the previous frame by the order 
+        # of the calls, and updated only if their kind or arguments changed, 
+        # the items left at the end of the frame being deleted. The options 
+        # of each item are kept too, so that an image stays alive as long as 
+        # it is drawn. Other attributes are the ones of the Tkinter canvas. 
+        # The create_* calls of the draw handler are only recorded in buffer 
+        # (kind, coordinates and options), and the changes of the frame are 
+        # sent to Tk at its end in a single Tcl script (word quoting its 
+        # values), instead of one call to Tk for each item: the items created 
+        # are named in the script by their index in the Tcl list of the new 
+        # items (which is the result of the script). end_frame returns 
+        # whether the canvas changed
+        cl = "class STconverter_canvas:\n" \
+             "    escapes = [(c, '\\\\' + c) for c in '\\\\[]{}$\";'] + \\\n" \
+             "              [(' ', '\\\\ '), ('\\t', '\\\\t'), ('\\n', '\\\\n'), ('\\r', '\\\\r'),\n" \
+             "               ('\\v', '\\\\v'), ('\\f', '\\\\f')]\n" \
+             "    \n" \
+             "    def __init__(self, canvas):\n" \
+             "        self.canvas = canvas\n" \
+             "        self.items = []\n" \
+             "        self.buffer = []\n" \
+             "    \n" \
+             "    def __getattr__(self, name):\n" \
+             "        return getattr(self.canvas, name)\n" \
+             "    \n" \
+             "    def begin_frame(self):\n" \
+             "        self.buffer = []\n" \
+             "    \n" \
+             "    def end_frame(self):\n" \
+             "        path = str(self.canvas)\n" \
+             "        items = self.items\n" \
+             "        script = []\n" \
+             "        created = []\n" \
+             "        for n, (kind, coords, options) in enumerate(self.buffer):\n" \
+             "            coords = self.flatten(coords)\n" \
+             "            if n < len(items):\n" \
+             "                old_kind, old_coords, old_options, item = items[n]\n" \
+             "                if old_kind == kind and sorted(old_options) == sorted(options):\n" \
+             "                    if coords != old_coords:\n" \
+             "                        script.append('%s coords %s %s' % (path, item, self.words(coords)))\n" \
+             "                    changed = [(k, v) for k, v in options.items() if old_options[k] != v]\n" \
+             "                    if changed:\n" \
+             "                        script.append('%s itemconfigure %s %s' % (path, item, self.options(changed)))\n" \
+             "                    items[n] = (kind, coords, options, item)\n" \
+             "                    continue\n" \
+             "                script.append('%s delete %s' % (path, item))\n" \
+             "            script.append('lappend STconverter_items [%s create %s %s %s]' % (\n" \
+             "                path, kind, self.words(coords), self.options(options.items())))\n" \
+             "            item = '[lindex $STconverter_items %s]' % len(created)\n" \
+             "            created.append(n)\n" \
+             "            if n < len(items):\n" \
+             "                items[n] = (kind, coords, options, item)\n" \
+             "                if n:\n" \
+             "                    script.append('%s raise %s %s' % (path, item, items[n - 1][3]))\n" \
+             "                else:\n" \
+             "                    script.append('%s lower %s' % (path, item))\n" \
+             "            else:\n" \
+             "                items.append((kind, coords, options, item))\n" \
+             "        if len(items) > len(self.buffer):\n" \
+             "            script.append('%s delete %s' % (path, ' '.join(\n" \
+             "                ['%s' % item[3] for item in items[len(self.buffer):]])))\n" \
+             "            del items[len(self.buffer):]\n" \
+             "        if not script:\n" \
+             "            return False\n" \
+             "        if created:\n" \
+             "            script.insert(0, 'set STconverter_items {}')\n" \
+             "            script.append('set STconverter_items')\n" \
+             "        script = '\\n'.join(script)\n" \
+             "        if not isinstance(script, str):\n" \
+             "            script = script.encode('utf-8')\n" \
+             "        try:\n" \
+             "            result = self.canvas.tk.eval(script)\n" \
+             "        except Exception:\n" \
+             "            self.canvas.delete('all')\n" \
+             "            self.items = []\n" \
+             "            raise\n" \
+             "        for n, item in zip(created, self.canvas.tk.splitlist(result)):\n" \
+             "            items[n] = items[n][:3] + (int(item),)\n" \
+             "        return True\n" \
+             "    \n" \
+             "    def flatten(self, values):\n" \
+             "        flat = []\n" \
+             "        for value in values:\n" \
+             "            if isinstance(value, (list, tuple)):\n" \
+             "                flat.extend(self.flatten(value))\n" \
+             "            else:\n" \
+             "                flat.append(value)\n" \
+             "        return flat\n" \
+             "    \n" \
+             "    def word(self, value):\n" \
+             "        if isinstance(value, (list, tuple)):\n" \
+             "            value = self.words(value)\n" \
+             "        elif isinstance(value, (int, float)):\n" \
+             "            return '%s' % value\n" \
+             "        else:\n" \
+             "            value = '%s' % value\n" \
+             "            if value.isalnum():\n" \
+             "                return value\n" \
+             "        for c, escape in self.escapes:\n" \
+             "            value = value.replace(c, escape)\n" \
+             "        return value or '{}'\n" \
+             "    \n" \
+             "    def words(self, values):\n" \
+             "        return ' '.join([self.word(value) for value in values])\n" \
+             "    \n" \
+             "    def options(self, options):\n" \
+             "        return ' '.join(['-%s %s' % (k, self.word(v)) for k, v in options])\n" \
+             "    \n" \
+             "    def create_line(self, *coords, **options):\n" \
+             "        self.buffer.append(('line', coords, options))\n" \
+             "    \n" \
+             "    def create_oval(self, *coords, **options):\n" \
+             "        self.buffer.append(('oval', coords, options))\n" \
+             "    \n" \
+             "    def create_polygon(self, *coords, **options):\n" \
+             "        self.buffer.append(('polygon', coords, options))\n" \
+             "    \n" \
+             "    def create_text(self, *coords, **options):\n" \
+             "        self.buffer.append(('text', coords, options))\n" \
+             "    \n" \
+             "    def create_image(self, *coords, **options):\n" \
+             "        self.buffer.append(('image', coords, options))\n\n"
+        self.add_after_imports(cl)
+        
+        # Class added to the converted file to draw the frames at fps frames 
+        # per second: the time of each frame is scheduled against a monotonic 
+        # clock, one period after the time of the previous one (not after the 
+        # end of its drawing), so that the time taken to draw does not slow 
+        # the frame rate down. If the drawing is late by more than a period, 
+        # the frames missed are skipped (counted in skipped) instead of being 
+        # drawn in a burst. frames, measured_fps, frame_time and 
+        # frame_time_max (in seconds) give the frames drawn, and the frame 
+        # rate and the time of drawing over the last second. With idle_fps, 
+        # once the canvas did not change for half a second of frames (see 
+        # STconverter_canvas.end_frame), the frames are drawn at idle_fps 
+        # frames per second only, until the canvas changes again or the 
+        # next key or mouse event or timer tick (see wake). The next frame is 
+        # scheduled even if the drawing fails (the error being reported by 
+        # Tkinter), so that the canvas, cleared by end_frame, is drawn again
+        idle_fps = None
+        if self.idle_fps:
+            idle_fps = "{i:g}".format(i=self.idle_fps)
+        fr = "class STconverter_frames:\n" \
+             "    fps = {f:g}\n" \
+             "    idle_fps = {i}\n" \
+             "    frames = skipped = 0\n" \
+             "    measured_fps = frame_time = frame_time_max = 0.0\n" \
+             "    idle = False\n" \
+             "    loop = None\n" \
+             "    \n" \
+             "    def __init__(self, root, draw):\n" \
+             "        self.root = root\n" \
+             "        self.draw = draw\n" \
+             "        self.clock = getattr(time, 'monotonic', time.time)\n" \
+             "        self.starts = collections.deque()\n" \
+             "        self.times = collections.deque()\n" \
+             "        self.deadline = self.clock()\n" \
+             "        self.static = 0\n" \
+             "        self.pending = None\n" \
+             "        STconverter_frames.loop = self\n" \
+             "        for event in ('<KeyPress>', '<KeyRelease>', '<ButtonPress>',\n" \
+             "                      '<ButtonRelease>', '<B1-Motion>'):\n" \
+             "            root.bind_all(event, self.wake, '+')\n" \
+             "    \n" \
+             "    def wake(self, event=None):\n" \
+             "        self.static = 0\n" \
+             "        if STconverter_frames.idle:\n" \
+             "            STconverter_frames.idle = False\n" \
+             "            self.root.after_cancel(self.pending)\n" \
+             "            self.deadline = self.clock()\n" \
+             "            self.pending = self.root.after(0, self.tick)\n" \
+             "    \n" \
+             "    def tick(self):\n" \
+             "        start = self.clock()\n" \
+             "        changed = True\n" \
+             "        try:\n" \
+             "            changed = self.draw()\n" \
+             "        finally:\n" \
+             "            self.schedule(start, changed)\n" \
+             "    \n" \
+             "    def schedule(self, start, changed):\n" \
+             "        end = self.clock()\n" \
+             "        self.starts.append(start)\n" \
+             "        self.times.append(end - start)\n" \
+             "        while len(self.starts) > 1 and end - self.starts[0] > 1:\n" \
+             "            self.starts.popleft()\n" \
+             "            self.times.popleft()\n" \
+             "        STconverter_frames.frames += 1\n" \
+             "        if len(self.starts) > 1:\n" \
+             "            STconverter_frames.measured_fps = (len(self.starts) - 1) / \\\n" \
+             "                float(self.starts[-1] - self.starts[0])\n" \
+             "        STconverter_frames.frame_time = sum(self.times) / len(self.times)\n" \
+             "        STconverter_frames.frame_time_max = max(self.times)\n" \
+             "        self.static = 0 if changed else self.static + 1\n" \
+             "        STconverter_frames.idle = bool(STconverter_frames.idle_fps) and \\\n" \
+             "            self.static > STconverter_frames.fps // 2\n" \
+             "        if STconverter_frames.idle:\n" \
+             "            period = 1.0 / STconverter_frames.idle_fps\n" \
+             "        else:\n" \
+             "            period = 1.0 / STconverter_frames.fps\n" \
+             "        self.deadline += period\n" \
+             "        late = end - self.deadline\n" \
+             "        if late > period:\n" \
+             "            STconverter_frames.skipped += int(late / period)\n" \
+             "            self.deadline += int(late / period) * period\n" \
+             "        self.pending = self.root.after(max(0, int((self.deadline - end) * 1000)), self.tick)\n\n".format(
+                 f=self.fps, i=idle_fps)
+        self.add_after_imports(fr)
+        self.add_imports(["time", "collections"])
+        
+        draw_n = self.findall(PATTERNS["draw_h"])[0]
         
         # create canvas with size used in "simplegui.create_frame"
         # and with a black background by default
         bg = ("'Black'", "")
         if ".set_canvas_background" in self.code:
-            bg = re.findall(sg_bg, self.code)[0]
-            self.code = re.sub(sg_bg, '', self.code)
-        self.code = FRAME_RE.sub(r'{f}\n{c}{b}'.format(f=tk_frame, c=tk_canvas, 
-                                     b=tk_bg.format(b=bg[0], m=bg[1])), 
-                                 self.code)
+            bg = self.findall(PATTERNS["bg"])[0]
+            self.sub(PATTERNS["bg"], '')
+        self.sub(PATTERNS["frame"], r'{f}\n{c}{b}'.format(f=tk_frame, c=tk_canvas, 
+                                        b=tk_bg.format(b=bg[0], m=bg[1])))
         
         # replace "set_draw_handler" with drawing handler call
-        refresh_time = 17 # in ms (66ms~15fps; 33ms~30fps; 17ms~60fps)
-        
-        dh_old = "{I}\w+.set_draw_handler\( *{h} *\){M}".format(
+        dh_old = "{I}(?<!\w)\w+.set_draw_handler\( *{h} *\){M}".format(
                      I=RNI["I"], h=draw_n, M=RNI["M"])
         dh_new = "\\1def refresh_canvas():\\2\n" \
+                 "\\1    canvas.begin_frame()\n" \
                  "\\1    {h}(canvas)\n" \
-                 "\\1    window_root.after({t}, refresh_canvas)\n\n" \
-                 "\\1refresh_canvas()\n".format(h=draw_n, t=refresh_time)
-        self.code = re.sub(dh_old, dh_new, self.code)
+                 "\\1    return canvas.end_frame()\n\n" \
+                 "\\1STconverter_frames(window_root, refresh_canvas).tick()\n".format(
+                     h=draw_n)
+        self.sub(compile_re(dh_old), dh_new, anchor="set_draw_handler")
     
     
-    def up_canvas_text(self):
-        """ update the Canvas text item(s) """
+    def up_calls(self):
+        """ update the SimpleGUI calls of RULES in a single scan of the code: 
+            the patterns of the rules whose trigger is in the code are joined 
+            in one alternation (with a named group for each rule), and each 
+            match is given to the replacement of its rule. The steps which 
+            depend on all the calls found by a rule are run after the scan """
+        
+        rules = [rule for rule in RULES if rule[1] in self.code]
+        if not rules:
+            return
+        
+        self.apply_edits()
+        code = self.code
+        scanner = compile_re("|".join("(?P<{n}>{p})".format(n=name, 
+                                          p=PATTERNS[name].pattern) 
+                                      for name, trigger, repl, after in rules))
+        
+        # candidate spans of all the triggers, merged
+        spans = []
+        for start, end in sorted(span for name, trigger, repl, after in rules 
+                                      for span in self.candidates(trigger)):
+            if spans and spans[-1][1] >= start:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+            else:
+                spans.append((start, end))
+        
+        replacements = dict((name, repl) for name, trigger, repl, after in rules)
+        self.stats["regex"] += 1
+        for start, end in spans:
+            for found in scanner.finditer(code, start, end):
+                # the match of the rule alone, with its own groups
+                name = found.lastgroup
+                match = PATTERNS[name].match(code, found.start(), end)
+                repl = replacements[name]
+                self.journal.add(match.start(), match.end(), 
+                                 repl(self, match) if callable(repl) 
+                                 else match.expand(repl))
+                self.calls[name].append(match)
+                self.stats["matches"] += 1
+        
+        for name, trigger, repl, after in rules:
+            if after is not None:
+                after(self)
+    
+    
+    def tk_text(self, match):
+        """ Canvas text item """
         
-        sg_txt = "{I}{No} *=? *{C}.draw_text\( *{Pt}{S}{Pc}{S}{P}{S}{Pq} *\)"
         tk_txt = "{i}ST_oval_x, ST_oval_y = {pc}\n" \
                  "{i}ST_oval_y += {p} / 3\n" \
                  "{i}{n}{c}.create_text([ST_oval_x, ST_oval_y], anchor='sw', " \
                      "text={pt}, font=('DejaVu Serif Condensed', {p}), fill={pq})"
         
-        texts = re.findall(sg_txt.format(I=RNI["I"], No=RNI["No"], C=RNI["C"], 
-                               Pt=RNI["Pt"], S=RNI["S"], Pc=RNI["Pc"], P=RNI["P"], 
-                               Pq=RNI["Pq"]), 
-                           self.code)
-        
-        for t in texts:
-            name = t[1] + " = " if t[1] else ""
-            self.code = re.sub(sg_txt.format(I=t[0], No=t[1], C=t[2], 
-                                   Pt=re.escape(t[3]), S=RNI["S"], Pc=re.escape(t[4]), 
-                                   P=re.escape(t[5]), Pq=re.escape(t[6])), 
-                               tk_txt.format(i=t[0], pc=t[4], p=t[5], n=name,
-                                   c=t[2], pt=t[3], pq=t[6]), 
-                               self.code)
+        i, n, c, pt, pc, p, pq = match.groups()
+        name = n + " = " if n else ""
+        return tk_txt.format(i=i, pc=pc, p=p, n=name, c=c, pt=pt, pq=pq)
     
     
-    def up_canvas_oval(self):
-        """ update the Canvas circle/oval item(s) """
+    def tk_circle(self, match):
+        """ Canvas circle/oval item """
         
-        # return if no circle/oval defined in input code
-        if "draw_circle" not in self.code:
-            return
-        
-        sg_circle = "{No} *=? *{C}.draw_circle" \
-                    "\( *{Pc}{S}{P}{S}{P}{S}{Pq}{S}?{Pq}? *\)".\
-                    format(No=RNI["No"], C=RNI["C"], Pc=RNI["Pc"], 
-                           S=RNI["S"], P=RNI["P"], Pq=RNI["Pq"])
         tk_oval     = '{c}.create_oval(({x1},{y1},{x2},{y2}), width={w}, ' \
                           'outline={l}, fill={f})'
-        tk_oval_var = '\\1coor = STconverter_oval({coor}, {r})\n' \
-                      '\\1{n}{c}.create_oval(coor, width={w}, ' \
+        tk_oval_var = '{i}coor = STconverter_oval({coor}, {r})\n' \
+                      '{i}{n}{c}.create_oval(coor, width={w}, ' \
                           'outline={l}, fill={f})'
-        # function added to the converted file to calculate oval(s) coordinates 
-        # if position and/or radius is a variable (not installed by default)
+        
+        i, n, c, coor, r, w, l, f = match.groups()
+        fill = f if f else '""'
+        
+        # if coor and r use digit only, without variables nor operations
+        is_pos_digit = not self.search(PATTERNS["operation"], coor)
+        is_rad_digit = not self.search(PATTERNS["operation"], r)
+        if is_pos_digit and is_rad_digit:
+            x, y = self.findall(PATTERNS["digit"], coor)
+            x1, x2 = (int(x) - int(r)), (int(x) + int(r))
+            y1, y2 = (int(y) - int(r)), (int(y) + int(r))
+            # keep the indentation and name as written in the input code
+            return match.string[match.start():match.start(3)] + \
+                   tk_oval.format(c=c, x1=x1, y1=y1, x2=x2, y2=y2, w=w, 
+                                  l=l, f=fill)
+        
+        # if position and/or radius is a variable
+        self.calls["oval_var"].append(match)
+        name = n + " = " if n else ''
+        return tk_oval_var.format(i=i, coor=coor, r=r, n=name, c=c, w=w, 
+                                  l=l, f=fill)
+    
+    
+    def after_circle(self):
+        """ add the function calculating oval(s) coordinates to the converted 
+            code if position and/or radius of a circle is a variable """
+        
         fn = "def STconverter_oval(xy, r):\n" \
              "    x, y = xy\n" \
              "    return ((x - r), (y - r), (x + r), (y + r))\n\n"
-        fn_needed = False
         
-        ovals = re.findall(sg_circle, self.code)
+        if self.calls["oval_var"]:
+            self.add_after_imports(fn)
+    
+    
+    def tk_polyline(self, match):
+        """ Canvas polyline item """
         
-        for oval in ovals:
-            n, c, coor, r, w, l, f = oval
-            fill = f if f else '""'
-            
-            # if coor and r use digit only, without variables nor operations
-            is_pos_digit = not re.findall(r"[a-zA-Z\+\-\*\/\%]", coor)
-            is_rad_digit = not re.findall(r"[a-zA-Z\+\-\*\/\%]", r)
-            if is_pos_digit and is_rad_digit:
-                x, y = re.findall(r"\d+", coor)
-                x1, x2 = (int(x) - int(r)), (int(x) + int(r))
-                y1, y2 = (int(y) - int(r)), (int(y) + int(r))
-                self.code = re.sub("{c}.draw_circle\( *" \
-                                   "{coor}{S}{r}{S}{w}{S}{l}{S}?{f} *\)".\
-                                   format(c=c, coor=re.escape(coor), S=RNI["S"], 
-                                       r=r, w=re.escape(w), l=re.escape(l), 
-                                       f=re.escape(f)), 
-                                   tk_oval.format(c=c, x1=x1, y1=y1, x2=x2, 
-                                       y2=y2, w=w, l=l, f=fill), 
-                                   self.code)
-            
-            # if position and/or radius is a variable
-            else:
-                fn_needed = True
-                name = n + " = " if n else ''
-                self.code = re.sub("{I}{n} *=? *{c}.draw_circle\( *" \
-                                   "{coor}{S}{r}{S}{w}{S}{l}{S}?{f} *\)".\
-                                   format(I=RNI["I"], n=n, c=c, 
-                                       coor=re.escape(coor), S=RNI["S"], 
-                                       r=re.escape(r), w=re.escape(w), 
-                                       l=re.escape(l), f=re.escape(f)), 
-                                   tk_oval_var.format(coor=coor, r=r, n=name, 
-                                       c=c, w=w, l=l, f=fill), 
-                                   self.code)
-        
-        # add fn to the converted code if needed 
-        if fn_needed:
-            last = re.findall("^((?:import +.+\n)|(?:from +.+\n))", 
-                              self.code, re.M)[-1]
-            self.code = re.sub(last, "{m}\n".format(m=last) + fn, self.code)
-    
-    
-    def up_canvas_line(self):
-        """ update the Canvas line item(s) """
-        
-        sg_line = "{C}.draw_line\( *{Pc}{S}{Pc}{S}{P}{S}{Pq} *\)".\
-                  format(C=RNI["C"], Pc=RNI["Pc"], S=RNI["S"], P=RNI["P"], 
-                         Pq=RNI["Pq"])
-        tk_line = "\\1.create_line(\\2, \\3, width=\\4, fill=\\5)"
-        self.code = re.sub(sg_line, tk_line, self.code)
-    
-    
-    def up_canvas_polyline(self):
-        """ update the Canvas polyline item(s) """
-        
-        sg_pline = "{C}.draw_polyline\( *{Pm}{S}{P}{S}{Pq} *\)"
         tk_pline = "{c}.create_line({coor}, width={w}, fill={f})"
         
-        polylines = re.findall(sg_pline.format(C=RNI["C"], Pm=RNI["Pm"], 
-                                   S=RNI["S"], P=RNI["P"], Pq=RNI["Pq"]), 
-                               self.code)
-        
-        for p in polylines:
-            # if coor is a variable, repeat the first point to avoid a crash 
-            # of the converted program in case the variable only has one point
-            is_coor_var = re.findall(r"^\w+", p[1])
-            coor = p[1] if not is_coor_var else p[1] + "[0], " + p[1]
-            self.code = re.sub(sg_pline.format(C=p[0], Pm=re.escape(p[1]), S=RNI["S"], 
-                                   P=re.escape(p[2]), Pq=re.escape(p[3])), 
-                               tk_pline.format(c=p[0], coor=coor, w=p[2], f=p[3]), 
-                               self.code)
+        c, coor, w, f = match.groups()
+        # if coor is a variable, repeat the first point to avoid a crash 
+        # of the converted program in case the variable only has one point
+        if self.search(PATTERNS["var"], coor):
+            coor = coor + "[0], " + coor
+        return tk_pline.format(c=c, coor=coor, w=w, f=f)
     
     
-    def up_canvas_polygon(self):
-        """ update the Canvas polygon item(s) """
+    def tk_polygon(self, match):
+        """ Canvas polygon item """
         
-        sg_poly = "{C}.draw_polygon\( *{Pm}{S}{P}{S}{Pq}{S}?{Pq}? *\)".\
-                  format(C=RNI["C"], Pm=RNI["Pm"], S=RNI["S"], P=RNI["P"], 
-                         Pq=RNI["Pq"])
         tk_poly = "{n}.create_polygon({c}, width={w}, outline={o}, fill={f})"
-        polygons = re.findall(sg_poly, self.code)
-        for p in polygons:
-            fill = p[4] if p[4] else '""'
-            self.code = re.sub('{n}.draw_polygon\( *{a}{S}{w}{S}{c}{S}?{f} *\)'.\
-                               format(n=p[0], a=re.escape(p[1]), S=RNI["S"], 
-                                   w=re.escape(p[2]), c=re.escape(p[3]), 
-                                   f=re.escape(p[4])), 
-                               tk_poly.format(n=p[0], c=p[1], w=p[2], o=p[3], 
-                                   f=fill), 
-                               self.code)
-    
-    
-    def up_button(self):
-        """ update Button widget(s) """
-        
-        sg_button = "{C}.add_button\( *{Pt}{S}{N}{S}?{P}? *\){M}".\
-                    format(C=RNI["C"], Pt=RNI["Pt"], S=RNI["S"], N=RNI["N"], 
-                           P=RNI["P"], M=RNI["M"])
-        sg_b_ch =   "{I}(?:\w+ *= *)?{f}.add_button\( *{m}{S}{h}{S}?{s} *\){M}"
-        tk_b_ws = "\\1{h}_bt = Tkinter.Button({f}, text={m}, command={h})\\2\n" \
-                  "\\1{h}_bt.config(width={s})\n" \
-                  "\\1{h}_bt.pack()\n"
-        tk_b_ns = "\\1{h}_bt = Tkinter.Button({f}, text={m}, command={h})\\2\n" \
-                  "\\1{h}_bt.pack()\n"
-        
-        buttons = re.findall(sg_button, self.code)
-        
-        for button in buttons:
-            # decrease by a factor 10 the button size (if any) to fit Tkinter 
-            size = button[3] if button[3] else ''
-            is_size_digit = not re.findall(r"[a-zA-Z\+\-\*\/\%]", size)
-            if size and is_size_digit:
-                size = int(size) / 10
-            
-            if size:
-                self.code = re.sub(sg_b_ch.format(I=RNI["I"], f=button[0], 
-                                       m=re.escape(button[1]), S=RNI["S"], 
-                                       h=button[2], s=re.escape(button[3]), 
-                                       M=RNI["M"]),
-                                   tk_b_ws.format(f=button[0], m=button[1], 
-                                       h=button[2], s=size), 
-                                   self.code)
-            elif not size:
-                self.code = re.sub(sg_b_ch.format(I=RNI["I"], f=button[0], 
-                                       m=re.escape(button[1]), S=RNI["S"], 
-                                       h=button[2], s=re.escape(button[3]), 
-                                       M=RNI["M"]),
-                                   tk_b_ns.format(f=button[0], m=button[1], 
-                                       h=button[2]), 
-                                   self.code)
-    
-    
-    def up_label(self):
-        """ update Label widget(s) """
-        
-        sg_label =    "{No} *=? *{C}.add_label\( *{Pt}{S}?{P}? *\){M}\n".\
-                      format(No=RNI["No"], C=RNI["C"], Pt=RNI["Pt"], 
-                             S=RNI["S"], P=RNI["P"], M=RNI["M"])
-        sg_label_nv  = "{I}{n} *=? *{f}.add_label\( *{m}{S}?{s} *\)"
-        sg_label_wv  = "{I}{n} *= *{f}.add_label\( *{m}{S}?{s} *\)"
-        tk_label_nv = "\\1Tkinter.Label({f}, text={m}, wraplength=200).pack()"
-        tk_label_wv = "\\1{n}_var = Tkinter.StringVar()\n" \
-                      "\\1{n} = Tkinter.Label({f}, textvariable={n}_var, wraplength=200).pack()\n" \
-                      "\\1{n}_var.set({m})"
-        
-        # find all labels in order to differentiate the ones using text variable
-        labels = re.findall(sg_label, self.code)
-        
-        for l in labels:
-            # not using text variable
-            if ("\n{n}.set_text".format(n=l[0]) and 
-                " {n}.set_text".format(n=l[0])) not in self.code:
-                self.code = re.sub(sg_label_nv.format(I=RNI["I"], n=l[0], 
-                                       f=l[1], S=RNI["S"], m=re.escape(l[2]), 
-                                       s=re.escape(l[3])), 
-                                   tk_label_nv.format(f=l[1], m=l[2]), 
-                                   self.code)
-            
-            # using text variable
-            else:
-                # update setting message
-                self.code = re.sub("([\n ]){n}.set_text\(".format(n=l[0]), 
-                                   "\\1{n}_var.set(".format(n=l[0]), 
-                                   self.code)
-                # update Label
-                self.code = re.sub(sg_label_wv.format(I=RNI["I"], n=l[0], 
-                                       f=l[1], S=RNI["S"], m=re.escape(l[2]), 
-                                       s=re.escape(l[3])), 
-                                   tk_label_wv.format(n=l[0], f=l[1], m=l[2]), 
-                                   self.code)
-    
-    
-    def up_input(self):
-        """ update Entry/Input widget(s) """
-        
-        # return if no input field defined in input code
-        if "add_input" not in self.code:
-            return
         
-        sg_input = "{I}{No} *=? *{C}.add_input\( *{Pt}{S}{N}{S}{P} *\){M}"
-        tk_input = "{i}{n}_lb = Tkinter.Label({f}, text={l}, wraplength=200)\\1\n" \
+        n, c, w, o, f = match.groups()
+        fill = f if f else '""'
+        return tk_poly.format(n=n, c=c, w=w, o=o, f=fill)
+    
+    
+    def tk_button(self, match):
+        """ Button widget """
+        
+        tk_b_ws = "{i}{h}_bt = Tkinter.Button({f}, text={m}, command={h}){c}\n" \
+                  "{i}{h}_bt.config(width={s})\n" \
+                  "{i}{h}_bt.pack()\n"
+        tk_b_ns = "{i}{h}_bt = Tkinter.Button({f}, text={m}, command={h}){c}\n" \
+                  "{i}{h}_bt.pack()\n"
+        
+        i, f, m, h, size, c = match.groups()
+        # decrease by a factor 10 the button size (if any) to fit Tkinter 
+        size = size if size else ''
+        is_size_digit = not self.search(PATTERNS["operation"], size)
+        if size and is_size_digit:
+            size = int(size) // 10
+        
+        if size:
+            return tk_b_ws.format(i=i, f=f, m=m, h=h, c=c, s=size)
+        return tk_b_ns.format(i=i, f=f, m=m, h=h, c=c)
+    
+    
+    def tk_label(self, match):
+        """ Label widget """
+        
+        tk_label_nv = "{i}Tkinter.Label({f}, text={m}, wraplength=200).pack()"
+        tk_label_wv = "{i}{n}_var = Tkinter.StringVar()\n" \
+                      "{i}{n} = Tkinter.Label({f}, textvariable={n}_var, wraplength=200).pack()\n" \
+                      "{i}{n}_var.set({m})"
+        
+        i, n, f, m, s, c = match.groups()
+        # not using text variable
+        if ("\n{n}.set_text".format(n=n) and
+            " {n}.set_text".format(n=n)) not in match.string:
+            return tk_label_nv.format(i=i, f=f, m=m)
+        
+        # using text variable
+        self.calls["label_var"].append(re.escape(n))
+        return tk_label_wv.format(i=i, n=n, f=f, m=m)
+    
+    
+    def after_label(self):
+        """ update setting message of the labels using text variable """
+        
+        variables = self.calls["label_var"]
+        if variables:
+            self.sub(compile_re("([\n ])({n}).set_text\(".format(
+                                    n="|".join(variables))), 
+                     "\\1\\2_var.set(", anchor="set_text(")
+    
+    
+    def tk_input(self, match):
+        """ Entry/Input widget """
+        
+        tk_input = "{i}{n}_lb = Tkinter.Label({f}, text={l}, wraplength=200){c}\n" \
                    "{i}{n}_lb.pack()\n" \
                    "{i}{n}_et = Tkinter.Entry({f})\n" \
                    "{i}{n}_et.bind('<Return>', {n})\n" \
                    "{i}{n}_et.config(width={s})\n" \
                    "{i}{n}_et.pack()\n"
-        sg_inp_eh = "{I}def {n}\( *{N} *\):"
-        tk_inp_eh = "\\1def {n}(\\2):\n" \
-                    "\\1    \\2 = {n}_et.get()"
-        
-        inputs = re.findall(sg_input.format(I=RNI["I"], No=RNI["No"], C=RNI["C"], 
-                                Pt=RNI["Pt"], S=RNI["S"], N=RNI["N"], P=RNI["P"], 
-                                M=RNI["M"]), 
-                            self.code)
-        
-        for i in inputs:
-            # update Input handler
-            self.code = re.sub(sg_inp_eh.format(I=RNI["I"], n=i[4], N=RNI["N"]), 
-                               tk_inp_eh.format(n=i[4]), 
-                               self.code)
-            
-            ## write Tkinter GUI of the Input widget
-            tk_input_size = "int(" + i[5] + "/10)"
-            self.code = re.sub(sg_input.format(I=i[0], No=i[1], C=i[2], 
-                                   Pt=re.escape(i[3]), S=RNI["S"], N=i[4], 
-                                   P=re.escape(i[5]), M=RNI["M"]), 
-                               tk_input.format(i=i[0], n=i[4], f=i[2], l=i[3], 
-                                   s=tk_input_size), 
-                               self.code)
+        
+        i, name, f, l, n, s, c = match.groups()
+        ## write Tkinter GUI of the Input widget
+        tk_input_size = "int(" + s + "/10)"
+        return tk_input.format(i=i, n=n, f=f, l=l, c=c, s=tk_input_size)
     
     
-    def up_timer(self):
-        """ update timer event """
-        
-        # return if no timer defined in input code
-        if "create_timer" not in self.code:
-            return
-        
-        # add a class to handle all timers at the beginning of the converted 
-        # file just after the imported modules 
+    def after_input(self):
+        """ update Input handler(s) """
+        
+        sg_inp_eh = "{I}def ({n})\( *{N} *\):"
+        tk_inp_eh = "\\1def \\2(\\3):\n" \
+                    "\\1    \\3 = \\2_et.get()"
+        
+        handlers = [re.escape(match.group(5)) for match in self.calls["input"]]
+        if handlers:
+            self.sub(compile_re(sg_inp_eh.format(I=RNI["I"], 
+                                    n="|".join(set(handlers)), N=RNI["N"])), 
+                     tk_inp_eh)
+    
+    
+    def after_timer(self):
+        """ add a class to handle all timers at the beginning of the converted 
+            file just after the imported modules, and update timer event 
+            handler(s) """
+        
+        # All timers are run by a single scheduler: the next tick of each 
+        # timer running is kept in a heap (queue) by its time on a monotonic 
+        # clock, and a single Tkinter callback (pending) is waiting for the 
+        # earliest one. A timer stopped is only marked as cancelled in the 
+        # heap (the heap being compacted once half of it is cancelled), so 
+        # that starting and stopping a timer takes O(log n), and a timer has 
+        # at most one tick in the heap. The next tick of a timer is one 
+        # interval after the time of the previous one (so that the timers do 
+        # not drift), and the ticks late by more than an interval are skipped, 
+        # or all run at once if the policy of the timer is 'catch_up'
         cl = "class STconverter_timer:\n" \
+             "    policy = 'skip'\n" \
+             "    queue = []\n" \
+             "    sequence = stale = 0\n" \
+             "    pending = due = None\n" \
+             "    clock = getattr(time, 'monotonic', time.time)\n" \
+             "    \n" \
              "    def __init__(self, interval, function):\n" \
              "        self.interval = int(interval)\n" \
              "        self.function = function\n" \
              "        self.status = False\n" \
+             "        self.entry = None\n" \
              "    \n" \
              "    def set_status(self, status):\n" \
-             "        if status != self.status:\n" \
-             "            self.status = status\n" \
-             "            self.run()\n" \
+             "        if status and not self.status:\n" \
+             "            self.status = True\n" \
+             "            self.push(STconverter_timer.clock() + self.period())\n" \
+             "            self.schedule()\n" \
+             "        elif self.status and not status:\n" \
+             "            self.status = False\n" \
+             "            self.cancel()\n" \
+             "    \n" \
+             "    def period(self):\n" \
+             "        return max(self.interval, 1) / 1000.0\n" \
+             "    \n" \
+             "    def push(self, deadline):\n" \
+             "        STconverter_timer.sequence += 1\n" \
+             "        self.entry = [deadline, STconverter_timer.sequence, self]\n" \
+             "        heapq.heappush(STconverter_timer.queue, self.entry)\n" \
+             "    \n" \
+             "    def cancel(self):\n" \
+             "        self.entry[2] = None\n" \
+             "        self.entry = None\n" \
+             "        STconverter_timer.stale += 1\n" \
+             "        queue = STconverter_timer.queue\n" \
+             "        if STconverter_timer.stale > len(queue) // 2:\n" \
+             "            queue[:] = [entry for entry in queue if entry[2] is not None]\n" \
+             "            heapq.heapify(queue)\n" \
+             "            STconverter_timer.stale = 0\n" \
+             "    \n" \
+             "    def schedule(self):\n" \
+             "        queue = STconverter_timer.queue\n" \
+             "        while queue and queue[0][2] is None:\n" \
+             "            heapq.heappop(queue)\n" \
+             "            STconverter_timer.stale -= 1\n" \
+             "        if not queue:\n" \
+             "            return\n" \
+             "        due = queue[0][0]\n" \
+             "        if STconverter_timer.pending is not None:\n" \
+             "            if STconverter_timer.due <= due:\n" \
+             "                return\n" \
+             "            window_root.after_cancel(STconverter_timer.pending)\n" \
+             "        STconverter_timer.due = due\n" \
+             "        delay = max(0, int((due - STconverter_timer.clock()) * 1000))\n" \
+             "        STconverter_timer.pending = window_root.after(delay, self.run)\n" \
              "    \n" \
              "    def run(self):\n" \
-             "        if self.status:\n" \
-             "            window_root.after(self.interval, self.run)\n" \
-             "            self.function()\n\n"
-        
-        last = re.findall("^((?:import +.+\n)|(?:from +.+\n))", 
-                          self.code, re.M)[-1]
-        self.code = re.sub(last, "{m}\n".format(m=last) + cl, self.code)
-        
-        # update timer(s) and event handler(s)
-        sg_timer = "{I}{N} *= *simplegui.create_timer\( *{P}{S}{F} *\){M}"
-        tk_timer = "{i}{t} = STconverter_timer({p}, {f}){m}"
-        
-        timers = re.findall(sg_timer.format(I=RNI["I"], N=RNI["N"], P=RNI["P"], 
-                                S=RNI["S"], F=RNI["F"], M=RNI["M"]), 
-                            self.code)
-        
-        for t in timers:
-            # update timer event handler(s)
-            sg_timer_start = "([ \n]){}\.start\(\)".format(t[1])
-            sg_timer_stop =  "([ \n]){}\.stop\(\)".format(t[1])
-            tk_timer_start = "\\1{}.set_status(True)".format(t[1])
-            tk_timer_stop =  "\\1{}.set_status(False)".format(t[1])
-            self.code = re.sub(sg_timer_start, tk_timer_start, self.code)
-            self.code = re.sub(sg_timer_stop, tk_timer_stop, self.code)
-            
-            # update timer(s)
-            self.code = re.sub(sg_timer.format(I=t[0], N=t[1], P=re.escape(t[2]), 
-                                   S=RNI["S"], F=re.escape(t[3]), M=re.escape(t[4])), 
-                               tk_timer.format(i=t[0], t=t[1], p=t[2], f=t[3], 
-                                   m=t[4]), 
-                               self.code)
-    
-     
+             "        STconverter_timer.pending = None\n" \
+             "        queue = STconverter_timer.queue\n" \
+             "        now = STconverter_timer.clock() + 0.001\n" \
+             "        try:\n" \
+             "            while queue and queue[0][0] <= now:\n" \
+             "                deadline, sequence, timer = heapq.heappop(queue)\n" \
+             "                if timer is None:\n" \
+             "                    STconverter_timer.stale -= 1\n" \
+             "                    continue\n" \
+             "                period = timer.period()\n" \
+             "                if timer.policy == 'skip':\n" \
+             "                    deadline += period * int((now - deadline) / period)\n" \
+             "                timer.push(deadline + period)\n" \
+             "                timer.function()\n" \
+             "{w}" \
+             "        finally:\n" \
+             "            self.schedule()\n\n"
+        
+        # a timer tick may change the canvas: the frames are drawn again at 
+        # full rate (see up_frame_canvas)
+        wake = ""
+        if "set_draw_handler" in self.features:
+            wake = "                if STconverter_frames.loop:\n" \
+                   "                    STconverter_frames.loop.wake()\n"
+        
+        self.add_after_imports(cl.format(w=wake))
+        self.add_imports(["time", "heapq"])
+        
+        # update timer event handler(s)
+        sg_timer_status = "([ \n])({t})\.(start|stop)\(\)"
+        tk_timer_status = {"start": "True", "stop": "False"}
+        
+        timers = [re.escape(match.group(2)) for match in self.calls["timer"]]
+        if timers:
+            self.sub(compile_re(sg_timer_status.format(t="|".join(timers))), 
+                     lambda match: "{s}{t}.set_status({b})".format(
+                         s=match.group(1), t=match.group(2), 
+                         b=tk_timer_status[match.group(3)]))
+    
+    
+    def tk_image(self, match):
+        """ image drawing, with the class added by up_image """
+        
+        tk_image = "{n}.draw({c}, {sc}, {ss}, {dc}, {ds}, {a}){m}\n"
+        
+        c, n, sc, ss, dc, ds, a, m = match.groups()
+        angle = a if a else 0
+        return tk_image.format(n=n, c=c, sc=sc, ss=ss, dc=dc, ds=ds, 
+                               a=angle, m=m)
+    
+    
+    def retrieve(self, url):
+        """ return the code retrieving the file of an URL (an expression of the 
+            converted code), from the bundle directory if assets are bundled 
+            (see up_assets) """
+        
+        if self.bundle:
+            return "STconverter_asset({u})".format(u=url)
+        return "STconverter_download({u})".format(u=url)
+    
+    
     def up_music(self):
         """ update music handler(s) to use pygame module. In case that several 
             musics/sounds are used in the program, the largest music/sound file 
@@ -494,46 +1940,43 @@ class Simplegui2Tkinter:
         if "simplegui.load_sound" not in self.code:
             return
         
-        # add pygame (to play the music/sounds) and urllib (to retrieve 
-        # music/sounds files over internet) modules to the output data
-        self.code = re.sub("(import +.*Tkinter.*\n)", 
-                           "\\1import pygame, urllib\n" + \
-                           "pygame.mixer.init()\n", 
-                           self.code)
+        # add pygame (to play the music/sounds) module to the output data (the 
+        # files are retrieved over internet by up_assets)
+        self.add_imports(["pygame"])
+        self.add_after_imports("pygame.mixer.init()\n")
         
         
         # update the longest music/sound to use the pygame music module
         
         # find all musics/sounds
-        m_all = re.findall("{No} *=? *simplegui.load_sound\( *{Pt} *\)".\
-                               format(No=RNI["No"], Pt=RNI["Pt"]), 
-                           self.code)
+        m_all = self.findall(PATTERNS["sound"])
         
         # verify or find source path of each music/sound
         for m in range(len(m_all)):
             if m_all[m][1][0] not in ["'", '"']:
                 # if the link is in a list
                 if "[" in m_all[m][1]:
-                    ref = re.findall("\w+", m_all[m][1])
-                    l = re.findall("{l} *= *\[\s*{Pq}+\s*\]".format(l=ref[0], 
-                                       Pq=RNI["Pq"], S=RNI["S"]), 
-                                   self.code, re.S)
-                    l = re.split(" *, *\n? *", l[0])[int(ref[1])][1:-1]
+                    ref = self.findall(PATTERNS["word"], m_all[m][1])
+                    l = self.findall(compile_re("{l} *= *\[\s*{Pq}\s*\]".format(
+                                             l=ref[0], Pq=RNI["Pq"], S=RNI["S"]), 
+                                         re.S))
+                    l = PATTERNS["list_sep"].split(l[0])[int(ref[1])][1:-1]
                     m_all[m] = [m_all[m], l]
                 
                 # if the link is the value of a variable
                 elif "[" not in m_all[m][1]:
-                    m_all[m] = [m_all[m], re.findall("{m} *= *{Pq}".format(
-                                    m=m_all[m][1].strip(), Pq=RNI["Pq"]), 
-                                self.code)[0][1:-1]]
+                    m_all[m] = [m_all[m], self.findall(compile_re(
+                                    "{m} *= *{Pq}".format(m=m_all[m][1].strip(), 
+                                                          Pq=RNI["Pq"])))[0][1:-1]]
             else:
                 m_all[m] = [m_all[m], m_all[m][1][1:-1]]
         
-        # find longest playing musics/sounds (the largest file size)
-        for m in range(len(m_all)):
-            m_size = urllib2.urlopen(
-                         m_all[m][1]).info().getheaders("Content-Length")[0]
-            m_all[m][1] = m_size
+        # find longest playing musics/sounds (the largest file size), the 
+        # sizes of all of them being asked at once (if not in cache yet)
+        assets = self.assets.get([music[1] for music in m_all])
+        self.assets_used.update(assets)
+        for music in m_all:
+            music[1] = assets[music[1]]["size"]
         
         m_longest = max(m_all, key=lambda music: int(music[1]))
         
@@ -543,44 +1986,36 @@ class Simplegui2Tkinter:
             # update music load, play, pause, rewind, volume
             sg_load = "{n} *=? *simplegui.load_sound\( *{u} *\)".format(
                           n=m[0], u=m[1])
-            tk_load = "pygame.mixer.music.load(urllib.urlretrieve({u})[0])".\
-                          format(u=m[1])
-            self.code = re.sub(sg_load, tk_load, self.code)
+            tk_load = "pygame.mixer.music.load({r})".format(
+                          r=self.retrieve(m[1]))
+            self.sub(compile_re(sg_load), tk_load)
             sg_play = "{n}.play\(\)".format(n=m[0])
             tk_play = "pygame.mixer.music.play(-1, pygame.mixer.music.get_pos())"
-            self.code = re.sub(sg_play, tk_play, self.code)
+            self.sub(compile_re(sg_play), tk_play)
             sg_pause = "{n}.pause\(\)".format(n=m[0])
             tk_pause = "pygame.mixer.music.pause()"
-            self.code = re.sub(sg_pause, tk_pause, self.code)
+            self.sub(compile_re(sg_pause), tk_pause)
             sg_rewind = "{n}.rewind\(\)".format(n=m[0])
             tk_rewind = "pygame.mixer.music.rewind()"
-            self.code = re.sub(sg_rewind, tk_rewind, self.code)
+            self.sub(compile_re(sg_rewind), tk_rewind)
             sg_vol = "{n}.set_volume\((.*)\)".format(n=m[0])
             tk_vol = "pygame.mixer.music.set_volume(\\1)"
-            self.code = re.sub(sg_vol, tk_vol, self.code)
+            self.sub(compile_re(sg_vol), tk_vol)
         
         
         # update others musics/sounds to use the pygame sound module
-        self.code = re.sub("simplegui.load_sound\((.*)\)",
-                           "pygame.mixer.Sound(urllib.urlretrieve(\\1)[0])",
-                           self.code)
+        self.sub(PATTERNS["sound_any"], 
+                 "pygame.mixer.Sound({r})".format(r=self.retrieve("\\1")))
     
     
     def up_image(self):
         """ update images using the Python Imaging Library (PIL) with ImageTk """
         
-        # return if no image used in input code
-        if "draw_image" not in self.code:
+        # return if no image used in input code (the drawings may already be 
+        # updated by up_calls)
+        if "draw_image" not in self.features:
             return
         
-        # add Python Imaging Library (PIL) (to process images) and urllib module 
-        # (to retrieve images from Internet) if not yet available
-        m_tk =  "(import +.*Tkinter.*\n)"
-        m_url = "(import +.*urllib.*\n)"
-        n_url = "\\1import urllib\n" \
-                "from PIL import Image, ImageTk\n\n"
-        w_url = "\\1from PIL import Image, ImageTk\n\n\n"
-        
         # Class added to the converted file if images are used in the program. 
         # The class will store, process, and draw images and the parts/tiles 
         # derived from them in a Tkinter-compatible manner, with: 
@@ -592,12 +2027,23 @@ class Simplegui2Tkinter:
         #                  on the canvas 
         # a = angle in radians of clockwise rotation around its center 
         # c = canvas
+        # The tiles of all images are kept in a single LRU cache, keyed by a 
+        # tuple of the image and of the parameters changing their pixels (not 
+        # d_coor, so that a moving sprite draws again the same tiles): once 
+        # they use more than budget bytes, the least recently drawn tiles are 
+        # removed (the tiles still on the canvas being kept alive by 
+        # STconverter_canvas). hits, misses and evictions count the uses of 
+        # the cache
         cl = "class STconverter_image:\n" \
+             "    tiles = collections.OrderedDict()\n" \
+             "    budget = {b}\n" \
+             "    size = 0\n" \
+             "    hits = misses = evictions = 0\n" \
+             "    \n" \
              "    def __init__(self, image):\n" \
              "        self.img = image\n" \
-             "        self.tiles = {}\n" \
              "    \n" \
-             "    def update(self, s_coor, s_size, d_size, d, ID):\n" \
+             "    def update(self, s_coor, s_size, d_size, d):\n" \
              "        x1, y1 = (s_coor[0]-s_size[0]/2), (s_coor[1]-s_size[1]/2)\n" \
              "        x2, y2 = (s_coor[0]+s_size[0]/2), (s_coor[1]+s_size[1]/2)\n" \
              "        processed = self.img.crop((int(x1), int(y1), int(x2), int(y2)))\n" \
@@ -605,48 +2051,170 @@ class Simplegui2Tkinter:
              "            processed = processed.resize(d_size, resample=Image.BILINEAR)\n" \
              "        if d:\n" \
              "            processed = processed.rotate(-d, resample=Image.BICUBIC, expand=1)\n" \
-             "        self.tiles[ID] = ImageTk.PhotoImage(processed)\n" \
-             "    \n" \
-             "    def create_ID(self, params):\n" \
-             "        return ','.join(str(param) for param in params)\n" \
+             "        return ImageTk.PhotoImage(processed)\n" \
              "    \n" \
              "    def draw(self, c, s_coor, s_size, d_coor, d_size, a):\n" \
              "        d = int((a * 180 / 3.1416) % 360)\n" \
-             "        ID = self.create_ID([s_coor, s_size, d_coor, d_size, d])\n" \
-             "        if ID not in self.tiles:\n" \
-             "            self.update(s_coor, s_size, d_size, d, ID)\n" \
-             "        canvas.create_image(d_coor, image=self.tiles[ID])\n\n"
-        
-        if "urllib" in self.code:
-            self.code = re.sub(m_url, w_url + cl, self.code)
-        else:
-            self.code = re.sub(m_tk, n_url + cl, self.code)
-        
-        
-        # update all images loading
-        self.code = re.sub("simplegui.load_image\( *{Pt} *\)".format(Pt=RNI["Pt"]), 
-                           "STconverter_image(Image.open(urllib.urlretrieve(\\1)[0]))", 
-                           self.code)
-        
-        
-        # update all images drawing
-        sg_image = "{N}.draw_image\( *{N}{S}{Pc}{S}{Pc}{S}{Pc}{S}{Pc}{S}?{P}? *\){M}"
-        sg_img_c = "{c}.draw_image\( *{n}{S}{sc}{S}{ss}{S}{dc}{S}{ds}{S}?{a}? *\){M}"
-        tk_image = "{n}.draw({c}, {sc}, {ss}, {dc}, {ds}, {a})\\1\n"
-        
-        images = re.findall(sg_image.format(N=RNI["N"], S=RNI["S"], Pc=RNI["Pc"], 
-                                P=RNI["P"], M=RNI["M"]), 
-                            self.code)
+             "        s_coor, s_size, d_size = tuple(s_coor), tuple(s_size), tuple(d_size)\n" \
+             "        ID = (self, s_coor, s_size, d_size, d)\n" \
+             "        tile = STconverter_image.tiles.pop(ID, None)\n" \
+             "        if tile is None:\n" \
+             "            STconverter_image.misses += 1\n" \
+             "            tile = self.update(s_coor, s_size, d_size, d)\n" \
+             "            STconverter_image.size += tile.width() * tile.height() * 4\n" \
+             "        else:\n" \
+             "            STconverter_image.hits += 1\n" \
+             "        STconverter_image.tiles[ID] = tile\n" \
+             "        self.evict()\n" \
+             "        canvas.create_image(d_coor, image=tile)\n" \
+             "    \n" \
+             "    def evict(self):\n" \
+             "        tiles = STconverter_image.tiles\n" \
+             "        while STconverter_image.size > STconverter_image.budget and len(tiles) > 1:\n" \
+             "            tile = tiles.pop(next(iter(tiles)))\n" \
+             "            STconverter_image.size -= tile.width() * tile.height() * 4\n" \
+             "            STconverter_image.evictions += 1\n\n".format(
+                 b=TILE_CACHE_SIZE)
+        
+        # add Python Imaging Library (PIL) (to process images, retrieved from 
+        # Internet by up_assets)
+        self.add_imports(["collections"], "from PIL import Image, ImageTk\n")
+        self.add_after_imports(cl)
+        
+        
+        # update all images loading (their drawing is updated by up_calls)
+        self.sub(PATTERNS["load_img"], 
+                 "STconverter_image(Image.open({r}))".format(
+                     r=self.retrieve("\\1")))
+    
+    
+    def up_assets(self):
+        """ load the musics/sounds and images through a cache of the files 
+            downloaded, in the user cache directory, and if the assets are 
+            bundled from the bundle directory next to the converted program 
+            first (see Asset_Bundle) """
+        
+        if "STconverter_download(" not in self.code and \
+           "STconverter_asset(" not in self.code:
+            return
         
-        for i in images:
-            angle = i[6] if i[6] else 0
-            self.code = re.sub(sg_img_c.format(c=i[0], n=i[1], sc=re.escape(i[2]), 
-                                   ss=re.escape(i[3]), dc=re.escape(i[4]), 
-                                   ds=re.escape(i[5]), a=re.escape(i[6]), 
-                                   S=RNI["S"], M=RNI["M"]), 
-                               tk_image.format(n=i[1], c=i[0], sc=i[2], ss=i[3], 
-                                   dc=i[4], ds=i[5], a=angle), 
-                               self.code)
+        modules, imports, fn = self.assets_code()
+        self.add_imports(modules, imports)
+        self.add_after_imports(fn + "\n")
+    
+    
+    def assets_code(self):
+        """ return the modules imported by up_assets, its other imports, and 
+            the functions that it adds after the imports """
+        
+        # STconverter_download returns the path of the file of an URL, kept in 
+        # a cache keyed by URL whose files are named by the hash of their 
+        # content. A file older than ASSET_TTL is downloaded again only if it 
+        # changed (with a conditional request), or used as it is when offline. 
+        # Once the cache is larger than DOWNLOAD_CACHE_SIZE bytes, the least 
+        # recently used files are removed
+        modules = ["os", "sys", "json", "time", "hashlib"]
+        imports = "try:\n" \
+                  "    from urllib2 import urlopen, Request, HTTPError\n" \
+                  "except ImportError:\n" \
+                  "    from urllib.request import urlopen, Request\n" \
+                  "    from urllib.error import HTTPError\n"
+        fn = "if sys.platform == 'win32':\n" \
+             "    STconverter_cache = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')\n" \
+             "elif sys.platform == 'darwin':\n" \
+             "    STconverter_cache = os.path.expanduser('~/Library/Caches')\n" \
+             "else:\n" \
+             "    STconverter_cache = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')\n" \
+             "STconverter_cache = os.path.join(STconverter_cache, 'STconverter')\n" \
+             "STconverter_cache_ttl = {t}\n" \
+             "STconverter_cache_size = {s}\n" \
+             "\n" \
+             "def STconverter_download(url):\n" \
+             "    index = STconverter_index()\n" \
+             "    entry = index.get(url)\n" \
+             "    path = entry and os.path.join(STconverter_cache, entry['file'])\n" \
+             "    if entry and os.path.isfile(path):\n" \
+             "        os.utime(path, None)\n" \
+             "        if 0 <= time.time() - entry['fetched'] < STconverter_cache_ttl:\n" \
+             "            return path\n" \
+             "    else:\n" \
+             "        entry = None\n" \
+             "    request = Request(url)\n" \
+             "    if entry and entry.get('etag'):\n" \
+             "        request.add_header('If-None-Match', entry['etag'])\n" \
+             "    if entry and entry.get('last_modified'):\n" \
+             "        request.add_header('If-Modified-Since', entry['last_modified'])\n" \
+             "    try:\n" \
+             "        response = urlopen(request, timeout=10)\n" \
+             "        data = response.read()\n" \
+             "        headers = response.info()\n" \
+             "        response.close()\n" \
+             "    except (HTTPError, IOError, OSError) as error:\n" \
+             "        if entry is None:\n" \
+             "            raise\n" \
+             "        if getattr(error, 'code', None) == 304:\n" \
+             "            entry['fetched'] = time.time()\n" \
+             "            STconverter_save(index)\n" \
+             "        return path\n" \
+             "    name = hashlib.sha1(data).hexdigest() + os.path.splitext(url.split('?')[0])[1][:8]\n" \
+             "    path = os.path.join(STconverter_cache, name)\n" \
+             "    if not os.path.isfile(path):\n" \
+             "        STconverter_save(data, name)\n" \
+             "    index[url] = {{'file': name, 'etag': headers.get('ETag'), \n" \
+             "                  'last_modified': headers.get('Last-Modified'), \n" \
+             "                  'fetched': time.time()}}\n" \
+             "    STconverter_evict(index, name)\n" \
+             "    STconverter_save(index)\n" \
+             "    return path\n" \
+             "\n" \
+             "def STconverter_index():\n" \
+             "    try:\n" \
+             "        with open(os.path.join(STconverter_cache, 'index.json')) as index:\n" \
+             "            return json.load(index)\n" \
+             "    except (IOError, OSError, ValueError):\n" \
+             "        return {{}}\n" \
+             "\n" \
+             "def STconverter_save(data, name='index.json'):\n" \
+             "    if not os.path.isdir(STconverter_cache):\n" \
+             "        os.makedirs(STconverter_cache)\n" \
+             "    path = os.path.join(STconverter_cache, name)\n" \
+             "    temp = '{{p}}.{{i}}.tmp'.format(p=path, i=os.getpid())\n" \
+             "    with open(temp, 'wb' if name != 'index.json' else 'w') as saved:\n" \
+             "        saved.write(data if name != 'index.json' else json.dumps(data))\n" \
+             "    if os.path.exists(path):\n" \
+             "        os.remove(path)\n" \
+             "    os.rename(temp, path)\n" \
+             "\n" \
+             "def STconverter_evict(index, keep):\n" \
+             "    files = []\n" \
+             "    for name in os.listdir(STconverter_cache):\n" \
+             "        if name != 'index.json' and not name.endswith('.tmp'):\n" \
+             "            stat = os.stat(os.path.join(STconverter_cache, name))\n" \
+             "            files.append((stat.st_mtime, stat.st_size, name))\n" \
+             "    size = sum(f[1] for f in files)\n" \
+             "    for mtime, file_size, name in sorted(files):\n" \
+             "        if size <= STconverter_cache_size:\n" \
+             "            break\n" \
+             "        if name != keep:\n" \
+             "            os.remove(os.path.join(STconverter_cache, name))\n" \
+             "            size -= file_size\n" \
+             "            for url in [u for u in index if index[u]['file'] == name]:\n" \
+             "                del index[url]\n".format(t=ASSET_TTL, s=DOWNLOAD_CACHE_SIZE)
+        
+        # STconverter_asset returns the path of the file of an URL in the 
+        # bundle directory, named by bundle_name, or else downloads it
+        if self.bundle:
+            fn += "\n" \
+                  "def STconverter_asset(url):\n" \
+                  "    name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + \\\n" \
+                  "           os.path.splitext(url.split('?')[0])[1][:8]\n" \
+                  "    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), \n" \
+                  "                        '{d}', name)\n" \
+                  "    if os.path.isfile(path):\n" \
+                  "        return path\n" \
+                  "    return STconverter_download(url)\n".format(d=BUNDLE_DIR)
+        
+        return modules, imports, fn
     
     
     def up_key(self):
@@ -656,14 +2224,26 @@ class Simplegui2Tkinter:
         if "set_keydown_handler" not in self.code:
             return
         
+        # the calls and names are all found before the code is edited, so that 
+        # the edits of this pass (and of the previous ones) are applied in a 
+        # single copy of the code
+        k_down = self.findall(PATTERNS["keydown"])[0]
+        k_up = self.findall(PATTERNS["keyup"])
+        handler = k_down[2].split(".")[-1]
+        param = self.findall(compile_re("def {e}\( *(?:self *, *)?{N} *\)".format(
+                                 e=handler, N=RNI["N"])), 
+                             anchor="def {e}(".format(e=handler))[0]
+        keys = list(collections.OrderedDict.fromkeys(
+                   [k.strip() for k in self.findall(PATTERNS["key_map"])]))
+        variables = [k.split(".")[-1] for k in keys if k[0] not in ['"', "'"]]
+        values = dict((v, self.findall(compile_re("{v} *= *[\"\']{N}[\"\']".format(
+                              v=v, N=RNI["N"])))) for v in variables)
+        
         # find and update pressed-key call to event handler
-        sg_k_down = "{I}{C}.set_keydown_handler\( *{N} *\){M}".format(
-                        I=RNI["I"], C=RNI["C"], N=RNI["N"], M=RNI["M"])
         tk_k_down = '\\1\\2.bind("<Key>", STconverter_keydown)\\4\n' \
                     '\\1\\2.focus_set()\n'
         
-        k_down = re.findall(sg_k_down, self.code)[0]
-        self.code = re.sub(sg_k_down, tk_k_down, self.code)
+        self.edit(PATTERNS["keydown"], tk_k_down)
         
         # function which will return to the key handlers the corresponding 
         # keysym when a key is pressed 
@@ -671,13 +2251,10 @@ class Simplegui2Tkinter:
              "    {kd}(key.keysym)\n\n".format(kd=k_down[2])        
         
         # find and update released-key call to event handler
-        sg_k_up = "{I}{C}.set_keyup_handler\( *{N} *\){M}".format(
-                      I=RNI["I"], C=RNI["C"], N=RNI["N"], M=RNI["M"])
         tk_k_up = '\\1\\2.bind("<KeyRelease>", STconverter_keyup)\\4\n'
         
-        k_up = re.findall(sg_k_up, self.code)
         if k_up:
-            self.code = re.sub(sg_k_up, tk_k_up, self.code)
+            self.edit(PATTERNS["keyup"], tk_k_up)
             
             # function which will return to the key handlers the corresponding 
             # keysym when a key is pressed 
@@ -685,94 +2262,67 @@ class Simplegui2Tkinter:
                  "def STconverter_keyup(key):\n" \
                  "    {ku}(key.keysym)\n\n".format(ku=k_up[0][2])
         
-        # add function(s) to the converted file 
-        last = re.findall("^((?:import +.+\n)|(?:from +.+\n))", 
-                          self.code, re.M)[-1]
-        self.code = re.sub(last, "{m}\n".format(m=last) + fn, self.code)
-        
         
         # update other key events:
         
         # capturing of key event: chr()
-        param = re.findall("def {e}\( *(?:self *, *)?{N} *\)".format(
-                               e=k_down[2].split(".")[-1], N=RNI["N"]), 
-                           self.code)[0]
-        self.code = re.sub("chr\( *({p}) *\)".format(p=param), "\\1", self.code)
+        self.edit(compile_re("chr\( *({p}) *\)".format(p=param)), "\\1", 
+                  anchor="chr(")
         
         #recognition of a specific pressed key
-        sg_k_spe = "simplegui.KEY_MAP{S}?\[ *{Pq} *\]"
+        sg_k_spe = SG["key_map"]
         tk_k_spe = '{k}'
         
-        keys = re.findall(sg_k_spe.format(S=RNI["S"], Pq=RNI["Pq"]), self.code)
-        
-        variables = []
         for k in keys:
-            k = k.strip()
             if k[0] in ['"', "'"]:
                 keymap = k if len(k[1:-1]) == 1 else k.title()
                 keymap = '"space"' if keymap in ["'Space'", '"Space"'] else keymap
             else:
                 keymap = k
-                variables.append(k)
-            self.code = re.sub(sg_k_spe.format(S=RNI["S"], Pq=re.escape(k)), 
-                               tk_k_spe.format(k=keymap),
-                               self.code)
+            self.edit(compile_re(sg_k_spe.format(S=RNI["S"], Pq=re.escape(k))), 
+                      tk_k_spe.format(k=keymap), anchor="KEY_MAP")
         
         # if the key was referenced by a variable, try to find the key back 
         for v in variables:
-            v = v.split(".")[-1]
-            key = re.findall("{v} *= *[\"\']{N}[\"\']".format(v=v, N=RNI["N"]), 
-                               self.code)
+            key = values[v]
             if key:
                 keymap = key[0] if len(key[0]) == 1 else key[0].title()
                 keymap = '"space"' if keymap in ["'Space'", '"Space"'] else keymap
-                self.code = re.sub("{v} *= *[\"\']{k}[\"\']".format(v=v, k=key[0]), 
-                                   "{v} = '{k}'".format(v=v, k=keymap), 
-                                   self.code)
+                self.edit(compile_re("{v} *= *[\"\']{k}[\"\']".format(v=v, 
+                                         k=key[0])), 
+                          "{v} = '{k}'".format(v=v, k=keymap))
+        
+        # add function(s) to the converted file, the last import being found 
+        # in the code with the edits above
+        self.add_after_imports(fn)
     
     
     def up_mouse(self):
         """ update mouse events """
         
-        # mouse click
+        # functions called by set_mouseclick_handler() and 
+        # set_mousedrag_handler(), found before the code is edited so that the 
+        # edits are applied in a single copy of the code
+        handlers = []
         if "set_mouseclick_handler" in self.code:
-            
-            sg_click = "{C}.set_mouseclick_handler\( *{N} *\){M}".format(
-                           C=RNI["C"], N=RNI["N"], M=RNI["M"])
-            tk_click = "canvas.bind('<Button-1>', \\2)\\3\n"
-            
-            # update function called by set_mouseclick_handler()
-            fn_name = re.findall(sg_click, self.code)[0][1]
-            self.code = re.sub("{I}def {n}\( *{N} *\):\n".format(I=RNI["I"], 
-                                   n=fn_name, N=RNI["N"]), 
-                               "\\1def {n}(\\2):\n" \
-                               "\\1    if isinstance(\\2, Tkinter.Event):\n" \
-                               "\\1        \\2 = (\\2.x, \\2.y)\n".format(
-                                   n=fn_name), 
-                               self.code)
-            
-            # update mouse click event handler registration
-            self.code = re.sub(sg_click, tk_click, self.code)
-        
-        # mouse drag
+            handlers.append((PATTERNS["click"], "<Button-1>"))
         if "set_mousedrag_handler" in self.code:
+            handlers.append((PATTERNS["drag"], "<B1-Motion>"))
+        handlers = [(pattern, event, self.findall(pattern)[0][1]) 
+                    for pattern, event in handlers]
+        
+        for pattern, event, fn_name in handlers:
             
-            sg_drag = "{C}.set_mousedrag_handler\( *{N} *\){M}".format(
-                          C=RNI["C"], N=RNI["N"], M=RNI["M"])
-            tk_drag = "canvas.bind('<B1-Motion>', \\2)\\3\n"
-            
-            # update the function called by set_mousedrag_handler()
-            fn_name = re.findall(sg_drag, self.code)[0][1]
-            self.code = re.sub("{I}def {n}\( *{N} *\):\n".format(I=RNI["I"], 
-                                   n=fn_name, N=RNI["N"]), 
-                               "\\1def {n}(\\2):\n" \
-                               "\\1    if isinstance(\\2, Tkinter.Event):\n" \
-                               "\\1        \\2 = (\\2.x, \\2.y)\n".format(
-                                   n=fn_name), 
-                               self.code)
+            # update the function called by the handler
+            self.edit(compile_re("{I}def {n}\( *{N} *\):\n".format(I=RNI["I"], 
+                                     n=fn_name, N=RNI["N"])), 
+                      "\\1def {n}(\\2):\n" \
+                      "\\1    if isinstance(\\2, Tkinter.Event):\n" \
+                      "\\1        \\2 = (\\2.x, \\2.y)\n".format(n=fn_name), 
+                      anchor="def {n}(".format(n=fn_name))
             
-            # update mouse drag event handler registration
-            self.code = re.sub(sg_drag, tk_drag, self.code)
+            # update mouse event handler registration
+            self.edit(pattern, "canvas.bind('{e}', \\2)\\3\n".format(e=event))
     
     
     def up_ini(self):
@@ -782,12 +2332,11 @@ class Simplegui2Tkinter:
         if "Tkinter.Frame" not in self.code:
             return
         
-        frame = re.findall("{N} = Tkinter.Frame\(".format(N=RNI["N"]), 
-                           self.code)[0]
-        self.code = re.sub("{f}.start\(\){M}".format(f=frame, M=RNI["M"]), 
-                           "", 
-                           self.code)
-        self.code = self.code + "\n\nwindow_root.mainloop()\n"
+        frame = self.findall(PATTERNS["frame_tk"])[0]
+        self.edit(compile_re("{f}.start\(\){M}".format(f=frame, M=RNI["M"])), "", 
+                  anchor="start()")
+        self.journal.add(len(self.code), len(self.code), 
+                         "\n\nwindow_root.mainloop()\n")
     
     
     def up_Tkinter_incompatible(self):
@@ -795,24 +2344,302 @@ class Simplegui2Tkinter:
         """ some color names specified to draw object in SimpleGUI canvas 
             aren't always well recognized by the OS/Tkinter ... change to 
             their hexadecimal values """
-        self.code = re.sub(r"[\"\'][aA]qua[\"\']", r"'#00FFFF'", self.code)
-        self.code = re.sub(r"[\"\'][fF]uchsia[\"\']", r"'#FF00FF'", self.code)
-        self.code = re.sub(r"[\"\'][lL]ime[\"\']", r"'#00FF00'", self.code)
-        self.code = re.sub(r"[\"\'][oO]live[\"\']", r"'#808000'", self.code)
-        self.code = re.sub(r"[\"\'][sS]ilver[\"\']", r"'#C0C0C0'", self.code)
-        self.code = re.sub(r"[\"\'][tT]eal[\"\']", r"'#008080'", self.code)
+        for color in sorted(self.features.intersection(COLORS)):
+            self.edit(PATTERNS[color], COLORS[color])
         
         """ SimpleGUI handles doc strings ending with four double quotes 
             which is not always well handled by other Python interpreters """
-        self.code = re.sub('""""', '"""', self.code)
+        if '""""' in self.features:
+            self.edit(PATTERNS["docstring"], '"""')
 
 
+# rules of the SimpleGUI calls updated by Simplegui2Tkinter.up_calls, in order 
+# of priority: (name of the statement in SG, trigger: literal on the line where 
+# each match starts, replacement: template or function returning the 
+# replacement of a match from the converter and the match, step run after the 
+# replacements, if any)
+RULES = [
+("text",     "draw_text",     Simplegui2Tkinter.tk_text,     None), 
+("circle",   "draw_circle",   Simplegui2Tkinter.tk_circle,   
+                              Simplegui2Tkinter.after_circle), 
+("line",     "draw_line",     "\\1.create_line(\\2, \\3, width=\\4, fill=\\5)", 
+                              None), 
+("polyline", "draw_polyline", Simplegui2Tkinter.tk_polyline, None), 
+("polygon",  "draw_polygon",  Simplegui2Tkinter.tk_polygon,  None), 
+("button",   "add_button",    Simplegui2Tkinter.tk_button,   None), 
+("label",    "add_label",     Simplegui2Tkinter.tk_label,    
+                              Simplegui2Tkinter.after_label), 
+("input",    "add_input",     Simplegui2Tkinter.tk_input,    
+                              Simplegui2Tkinter.after_input), 
+("timer",    "create_timer",  "\\1\\2 = STconverter_timer(\\3, \\4)\\5", 
+                              Simplegui2Tkinter.after_timer), 
+("image",    "draw_image",    Simplegui2Tkinter.tk_image,    None)
+]
+
+
+# names of the rules added by register_rule, and triggers that it added to 
+# CALL_NAMES and REGION_NAMES (removed by unregister_rule)
+REGISTERED = set()
+REGISTERED_TRIGGERS = set()
+
+def register_rule(name, trigger, pattern, replacement, after=None):
+    """ add a rule to RULES, so that the calls matching pattern (written with 
+        the elements of RNI, as the statements of SG) are updated by up_calls 
+        in the same scan as the SimpleGUI calls, for example to convert the 
+        calls of another CodeSkulptor module. The trigger is a literal found 
+        in each match, on the line where it starts. The replacement is a 
+        template (as for re.sub), or a function returning the replacement of 
+        a match from the converter and the match. After all the replacements, 
+        the function after, if any, is called with the converter. The token 
+        engine converts the lines with the trigger as the SimpleGUI calls """
+    
+    global TOKENS
+    
+    if not re.match(r"[A-Za-z_]\w*$", name) or name in SG:
+        raise ValueError("invalid or existing rule name: {n}".format(n=name))
+    
+    SG[name] = pattern
+    PATTERNS[name] = re.compile(pattern.format(**RNI))
+    LITERALS[name] = trigger
+    ANCHORS[PATTERNS[name]] = trigger
+    RULES.append((name, trigger, replacement, after))
+    REGISTERED.add(name)
+    
+    if trigger not in CALL_NAMES:
+        REGISTERED_TRIGGERS.add(trigger)
+    CALL_NAMES.add(trigger)
+    REGION_NAMES.add(re.escape(trigger))
+    TOKENS = tokens(REGION_NAMES)
+
+
+def unregister_rule(name):
+    """ remove a rule added by register_rule, with its trigger if no other 
+        rule uses it, so that the tables are as before its registration """
+    
+    global TOKENS
+    
+    if name not in REGISTERED:
+        raise ValueError("rule not registered: {n}".format(n=name))
+    
+    REGISTERED.remove(name)
+    del SG[name]
+    pattern = PATTERNS.pop(name)
+    trigger = LITERALS.pop(name)
+    if pattern not in PATTERNS.values():
+        del ANCHORS[pattern]
+    RULES[:] = [rule for rule in RULES if rule[0] != name]
+    
+    if trigger in REGISTERED_TRIGGERS and \
+       not any(rule[1] == trigger for rule in RULES):
+        REGISTERED_TRIGGERS.remove(trigger)
+        CALL_NAMES.remove(trigger)
+        REGION_NAMES.remove(re.escape(trigger))
+        TOKENS = tokens(REGION_NAMES)
 
 
-########## GUI of the application ##########
 
-# import modules for the GUI
-import Tkinter, tkFileDialog, tkMessageBox
+class Conversion_Cache:
+    """ on-disk cache of the converted codes, content-addressed by a hash of 
+        the input code, of the converter source and of the options changing 
+        the output. A conversion depending on the metadata of assets is stored 
+        under a key including them, its first key giving only their URLs. 
+        Once the cache is larger than max_size bytes, the least recently used 
+        conversions are evicted """
+    
+    def __init__(self, directory, max_size=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.size = sum(os.path.getsize(path) for path in self.files())
+    
+    
+    def key(self, code, *options):
+        """ return the key of an input code for this converter source and 
+            these conversion options """
+        
+        key = "\0".join((SOURCE_HASH,) + options + (code,))
+        if not isinstance(key, bytes):
+            key = key.encode("utf-8")
+        return hashlib.sha1(key).hexdigest()
+    
+    
+    def asset_key(self, key, assets):
+        """ return the key of a conversion of key depending on the metadata of 
+            assets (URL: metadata, see Asset_Cache), with their sizes """
+        
+        return self.key(key, *("{u}\0{s}".format(u=url, s=assets[url]["size"]) 
+                               for url in sorted(assets)))
+    
+    
+    def path(self, key):
+        """ return the path of the file of a cached conversion """
+        
+        return os.path.join(self.directory, key[:2], key)
+    
+    
+    def files(self):
+        """ return the paths of all cached conversions """
+        
+        return [os.path.join(root, name)
+                for root, dirs, names in os.walk(self.directory)
+                for name in names if not name.endswith(".tmp")]
+    
+    
+    def read(self, key):
+        """ return the cached file of key, or None if not in cache """
+        
+        try:
+            with open(self.path(key)) as cached:
+                code = cached.read()
+        except (IOError, OSError):
+            return None
+        
+        # mark the conversion as recently used
+        os.utime(self.path(key), None)
+        return code
+    
+    
+    def get(self, key, assets=None):
+        """ return the cached conversion of key, or None if not in cache. A 
+            conversion depending on the metadata of assets is returned only if 
+            their metadata in assets (an Asset_Cache) did not change """
+        
+        code = self.read(key)
+        if code is not None and code.startswith(ASSETS_RECORD):
+            urls = code[len(ASSETS_RECORD):].split("\n")
+            if assets is None:
+                assets = Asset_Cache()
+            code = self.read(self.asset_key(key, assets.get(urls)))
+        
+        if code is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return code
+    
+    
+    def put(self, key, code, assets=None):
+        """ store the conversion of key, depending on the metadata of assets 
+            (URL: metadata, see Asset_Cache) if given """
+        
+        if assets:
+            self.write(key, ASSETS_RECORD + "\n".join(sorted(assets)))
+            key = self.asset_key(key, assets)
+        self.write(key, code)
+    
+    
+    def write(self, key, code):
+        """ write the file of key, evicting old ones if needed """
+        
+        path = self.path(key)
+        if not os.path.isdir(os.path.dirname(path)):
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError:
+                # created meanwhile by another process
+                pass
+        
+        # an overwritten conversion no longer counts in the size of the cache
+        try:
+            self.size -= os.path.getsize(path)
+        except OSError:
+            pass
+        
+        # write then rename, so that another process never reads half a file
+        temp = "{p}.{pid}.tmp".format(p=path, pid=os.getpid())
+        with open(temp, "w") as cached:
+            cached.write(code)
+        os.rename(temp, path)
+        
+        self.size += os.path.getsize(path)
+        if self.size > self.max_size:
+            self.evict()
+    
+    
+    def evict(self):
+        """ remove the least recently used conversions until the cache uses 
+            less than 3/4 of its maximum size """
+        
+        entries = []
+        for path in self.files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        
+        # the size is computed again, other processes may share the cache
+        self.size = sum(entry[1] for entry in entries)
+        for mtime, size, path in entries:
+            if self.size <= self.max_size * 3 // 4:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+            self.evictions += 1
+
+
+
+def convert(source, cache=None, profiler=None, time_budget=None, 
+            engine="regex", assets=None, bundle=False, fps=FPS, idle_fps=None):
+    """ return the code of a SimpleGUI program converted to Tkinter, or 
+        "___NoSimpleguiFound!___" if the code does not use SimpleGUI. 
+        If a Conversion_Cache is given, a code already converted is returned 
+        from the cache without running the conversion again. If a profiler 
+        function is given, it receives the statistics of each pass run. If a 
+        time budget is given (in seconds), ConversionTimeout is raised when 
+        the conversion takes longer. The engine is one of ENGINES. The 
+        metadata of the sounds are taken from assets, an Asset_Cache, if given. 
+        With bundle, the converted code loads its assets from BUNDLE_DIR, 
+        filled by Asset_Bundle (see bundle_assets). The converted code draws 
+        fps frames per second, and only idle_fps frames per second while its 
+        canvas does not change if idle_fps is given """
+    
+    if cache is None:
+        return Simplegui2Tkinter(source, profiler, time_budget, engine, 
+                                 assets, bundle, fps, idle_fps).convert()
+    
+    # the rules registered change the conversion too
+    key = cache.key(source, engine, "bundle" if bundle else "", 
+                    "{f:g} fps".format(f=fps), 
+                    "{i:g} idle fps".format(i=idle_fps) if idle_fps else "", 
+                    *(name + "\0" + SG[name] 
+                      for name, trigger, repl, after in RULES))
+    # the sizes of the sounds change the conversion too (see up_music), so 
+    # that they are checked again before using a cached conversion
+    if assets is None:
+        assets = Asset_Cache()
+    code = cache.get(key, assets)
+    if code is None:
+        converter = Simplegui2Tkinter(source, profiler, time_budget, engine, 
+                                      assets, bundle, fps, idle_fps)
+        code = converter.convert()
+        cache.put(key, code, converter.assets_used)
+    return code
+
+
+def bundle_assets(code, directory, ttl=ASSET_TTL):
+    """ download the assets of a code converted with bundle into the bundle 
+        directory of the converted program (BUNDLE_DIR in the directory 
+        given), return its Asset_Bundle. A download failing raises IOError """
+    
+    bundle = Asset_Bundle(os.path.join(directory, BUNDLE_DIR), ttl)
+    bundle.add(find_asset_urls(code))
+    return bundle
+
+
+
+
+########## GUI of the application ##########
 
 
 class Window_App:
@@ -828,6 +2655,9 @@ class Window_App:
         
         self.isWindows = False
         
+        # metadata of the sounds, kept for the next conversions
+        self.assets = Asset_Cache()
+        
         self.main()
     
     
@@ -940,11 +2770,7 @@ class Window_App:
         """ verify that a filename use the correct extension (otherwise add it) 
             and, if specified, insert a tag between the name and the extension """
         
-        if filename[-len(extension):] == extension:
-            return filename[:-len(extension)] + tag + extension
-        
-        else:
-            return filename + tag + extension
+        return update_name(filename, extension, tag)
     
     
     def convert_st(self):
@@ -957,7 +2783,13 @@ class Window_App:
             return
         
         # conversion of the input file by calling the Simplegui2Tkinter class
-        output_data = Simplegui2Tkinter(self.input_data).convert()
+        try:
+            output_data = Simplegui2Tkinter(self.input_data, 
+                                            time_budget=TIME_BUDGET, 
+                                            assets=self.assets).convert()
+        except ConversionTimeout as error:
+            tkMessageBox.showerror("Conversion stopped!", message=str(error))
+            return
         
         # return an error message if the input file has no SimpleGUI module
         if "___NoSimpleguiFound!___" in output_data:
@@ -979,11 +2811,431 @@ class Window_App:
 
 
 
-# create the application window
-window_root = Tkinter.Tk()
-window_root.title("SimpleGUI/Tkinter converter")
+def gui():
+    """ start the application window """
+
+    # import modules for the GUI
+    global Tkinter, tkFileDialog, tkMessageBox
+    import Tkinter, tkFileDialog, tkMessageBox
+    
+    # create the application window
+    window_root = Tkinter.Tk()
+    window_root.title("SimpleGUI/Tkinter converter")
+
+    app = Window_App(window_root)
+
+    # initiate the application window
+    window_root.mainloop()
+
+
+
+
+########## Batch conversion (command line) ##########
+
+# cache of the conversions shared by the files converted by a worker process
+worker_cache = None
+# whether workers return the statistics of each pass of the conversions
+worker_profile = False
+# time budget of each conversion of a worker process (None for no limit)
+worker_time_budget = None
+# engine of the conversions of a worker process
+worker_engine = "regex"
+# cache of the metadata of the assets, shared by the conversions of a worker 
+# process (and with the other workers through its directory)
+worker_assets = None
+# whether the assets of the converted files are downloaded next to them
+worker_bundle = False
+# frames drawn per second by the converted files, and while their canvas does 
+# not change (None for the same frame rate)
+worker_fps = FPS
+worker_idle_fps = None
+
+
+def update_name(filename, extension, tag=""):
+    """ verify that a filename use the correct extension (otherwise add it) 
+        and, if specified, insert a tag between the name and the extension """
+    
+    if filename[-len(extension):] == extension:
+        return filename[:-len(extension)] + tag + extension
+    
+    else:
+        return filename + tag + extension
+
+
+def find_files(paths):
+    """ expand the files, directories and glob patterns given in the command 
+        line to the Python files to convert, ignoring files already converted """
+    
+    files = []
+    
+    for path in paths:
+        for found in sorted(glob.glob(path)) or [path]:
+            if os.path.isdir(found):
+                for root, dirs, names in os.walk(found):
+                    dirs.sort()
+                    files.extend(os.path.join(root, name)
+                                 for name in sorted(names) if name.endswith(".py"))
+            else:
+                files.append(found)
+    
+    # a file matched several times (by a directory and a pattern) or already 
+    # converted is ignored
+    seen = set()
+    return [f for f in files if not (f in seen or seen.add(f))
+                                and "(converted)" not in os.path.basename(f)]
+
+
+def init_worker(cache_dir, cache_size, profile=False, time_budget=None, 
+                engine="regex", asset_dir=None, asset_ttl=ASSET_TTL, 
+                bundle=False, fps=FPS, idle_fps=None):
+    """ initialize a worker process of the batch conversion """
+    
+    global worker_cache, worker_profile, worker_time_budget, worker_engine, \
+           worker_assets, worker_bundle, worker_fps, worker_idle_fps
+    if cache_dir:
+        worker_cache = Conversion_Cache(cache_dir, cache_size)
+    worker_profile = profile
+    worker_time_budget = time_budget
+    worker_engine = engine
+    worker_assets = Asset_Cache(asset_dir, asset_ttl)
+    worker_bundle = bundle
+    worker_fps = fps
+    worker_idle_fps = idle_fps
+
+
+def convert_file(job):
+    """ convert a file and save the result next to it (or in the output 
+        directory), return the status and the statistics of the conversion """
+    
+    path, output_dir = job
+    result = {"path": path, "output": None, "status": "converted", 
+              "size_in": 0, "size_out": 0, "time": 0.0, "asset_requests": 0, 
+              "downloads": 0}
+    start = time.time()
+    requests = worker_assets.requests if worker_assets is not None else 0
+    
+    try:
+        with open(path) as input_file:
+            input_data = input_file.read()
+        result["size_in"] = len(input_data)
+        
+        profiler = None
+        if worker_profile:
+            result["profile"] = []
+            profiler = result["profile"].append
+        
+        if worker_cache is not None:
+            hits = worker_cache.hits
+            output_data = convert(input_data, worker_cache, profiler, 
+                                  worker_time_budget, worker_engine, 
+                                  worker_assets, worker_bundle, worker_fps, 
+                                  worker_idle_fps)
+            result["cache"] = "hit" if worker_cache.hits > hits else "miss"
+        else:
+            output_data = convert(input_data, profiler=profiler, 
+                                  time_budget=worker_time_budget, 
+                                  engine=worker_engine, assets=worker_assets, 
+                                  bundle=worker_bundle, fps=worker_fps, 
+                                  idle_fps=worker_idle_fps)
+        
+        # do not write anything if the file has no SimpleGUI module
+        if "___NoSimpleguiFound!___" in output_data:
+            result["status"] = "skipped"
+        else:
+            directory, filename = os.path.split(path)
+            result["output"] = os.path.join(output_dir or directory, 
+                                   update_name(filename, ".py", tag="(converted)"))
+            with open(result["output"], "w") as output_file:
+                output_file.write(output_data)
+            result["size_out"] = len(output_data)
+            
+            if worker_bundle:
+                bundle = bundle_assets(output_data, 
+                                       os.path.dirname(result["output"]), 
+                                       worker_assets.ttl)
+                result["downloads"] = bundle.downloads
+    
+    except Exception as error:
+        result["status"] = "failed"
+        result["error"] = "{e}: {m}".format(e=type(error).__name__, m=error)
+    
+    if worker_assets is not None:
+        result["asset_requests"] = worker_assets.requests - requests
+    result["time"] = time.time() - start
+    return result
+
+
+def print_profile(results):
+    """ print the statistics of each conversion pass, summed over all the 
+        conversions of a batch, from the slowest to the fastest pass """
+    
+    passes = {}
+    for result in results:
+        for stats in result.get("profile", []):
+            total = passes.setdefault(stats["pass"], dict.fromkeys(
+                        ("runs", "time", "regex", "matches", "copies", 
+                         "bytes_in", "bytes_out"), 0))
+            total["runs"] += 1
+            for k in ("time", "regex", "matches", "copies", "bytes_in", 
+                      "bytes_out"):
+                total[k] += stats[k]
+    
+    print("{p:<24} {r:>6} {t:>9} {x:>8} {m:>8} {c:>7} {i:>9} {o:>9}".format(
+              p="pass", r="runs", t="time (s)", x="regex", m="matches", 
+              c="copies", i="KB in", o="KB out"))
+    for name in sorted(passes, key=lambda name: -passes[name]["time"]):
+        total = passes[name]
+        print("{p:<24} {r:>6} {t:>9.3f} {x:>8} {m:>8} {c:>7} {i:>9.1f} "
+              "{o:>9.1f}".format(
+                  p=name, r=total["runs"], t=total["time"], x=total["regex"], 
+                  m=total["matches"], c=total["copies"], 
+                  i=total["bytes_in"] / 1024.0, o=total["bytes_out"] / 1024.0))
+
+
+def batch_convert(files, output_dir=None, processes=None, quiet=False, 
+                  cache_dir=None, cache_size=64 * 1024 * 1024, profile=False, 
+                  time_budget=None, engine="regex", asset_dir=None, 
+                  asset_ttl=ASSET_TTL, bundle=False, fps=FPS, idle_fps=None):
+    """ convert all files with a pool of worker processes, print the result 
+        of each conversion and a throughput summary. Conversions are cached 
+        in cache_dir, if given. With profile, the statistics of each pass 
+        are also printed. A conversion longer than time_budget seconds is 
+        stopped and reported as failed. The engine is one of ENGINES. The 
+        metadata of the assets are cached in asset_dir (by default in a 
+        temporary directory removed at the end), so that each URL is asked 
+        only once by all the workers. With bundle, the assets are downloaded 
+        next to the converted files (see bundle_assets). The converted files 
+        draw fps frames per second (idle_fps while their canvas does not 
+        change, if given) """
+    
+    import multiprocessing
+    import shutil
+    import tempfile
+    
+    processes = processes or multiprocessing.cpu_count()
+    jobs = [(f, output_dir) for f in files]
+    chunksize = max(1, len(jobs) // (processes * 4))
+    results = []
+    
+    temp_dir = None
+    if not asset_dir:
+        asset_dir = temp_dir = tempfile.mkdtemp(prefix="STconverter-assets-")
+    
+    start = time.time()
+    pool = multiprocessing.Pool(processes, initializer=init_worker, 
+                                initargs=(cache_dir, cache_size, profile, 
+                                          time_budget, engine, asset_dir, 
+                                          asset_ttl, bundle, fps, idle_fps))
+    try:
+        for result in pool.imap_unordered(convert_file, jobs, chunksize):
+            results.append(result)
+            if result["status"] == "failed":
+                print("FAILED {p} ({e})".format(p=result["path"], 
+                                                e=result["error"]))
+            elif not quiet:
+                print("{s:<9} {p}".format(s=result["status"], p=result["path"]))
+    finally:
+        pool.close()
+        pool.join()
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    elapsed = time.time() - start
+    
+    # throughput summary
+    count = dict((s, len([r for r in results if r["status"] == s]))
+                 for s in ("converted", "skipped", "failed"))
+    size_in = sum(r["size_in"] for r in results)
+    print("{n} file(s): {c} converted, {s} skipped, {f} failed "
+          "in {t:.2f}s with {p} process(es)".format(n=len(results), 
+              c=count["converted"], s=count["skipped"], f=count["failed"], 
+              t=elapsed, p=processes))
+    print("throughput: {fs:.1f} files/s, {kb:.1f} KB/s".format(
+              fs=len(results) / elapsed if elapsed else 0.0, 
+              kb=size_in / 1024.0 / elapsed if elapsed else 0.0))
+    if cache_dir:
+        hits = len([r for r in results if r.get("cache") == "hit"])
+        misses = len([r for r in results if r.get("cache") == "miss"])
+        print("cache: {h} hit(s), {m} miss(es) ({r:.0f}% hit rate)".format(
+                  h=hits, m=misses, 
+                  r=100.0 * hits / (hits + misses) if hits + misses else 0.0))
+    requests = sum(r["asset_requests"] for r in results)
+    if requests:
+        print("assets: {n} request(s) for the metadata of the sounds".format(
+                  n=requests))
+    if bundle:
+        print("bundle: {n} asset(s) downloaded".format(
+                  n=sum(r["downloads"] for r in results)))
+    if profile:
+        print_profile(results)
+    
+    return results
+
+
+def watch(paths, output_dir=None, interval=0.5, debounce=0.3, cache_dir=None, 
+          cache_size=64 * 1024 * 1024, time_budget=None, engine="regex", 
+          asset_dir=None, asset_ttl=ASSET_TTL, bundle=False, fps=FPS, 
+          idle_fps=None):
+    """ watch the files matched by paths (polling their modification time and 
+        size every interval seconds) and convert again the ones whose content 
+        changed. A file is converted once it has not changed for debounce 
+        seconds, so that a burst of saves triggers a single conversion """
+    
+    init_worker(cache_dir, cache_size, time_budget=time_budget, engine=engine, 
+                asset_dir=asset_dir, asset_ttl=asset_ttl, bundle=bundle, 
+                fps=fps, idle_fps=idle_fps)
+    
+    # path: (modification time, size, hash of the content) of watched files
+    known = {}
+    # path: time when a change of the file was last seen
+    pending = {}
+    
+    def state(path):
+        stat = os.stat(path)
+        return stat.st_mtime, stat.st_size
+    
+    for path in find_files(paths):
+        try:
+            with open(path, "rb") as input_file:
+                known[path] = state(path) + \
+                              (hashlib.sha1(input_file.read()).digest(),)
+        except (IOError, OSError):
+            continue
+    print("watching {n} file(s), press Ctrl-C to stop".format(n=len(known)))
+    
+    try:
+        while True:
+            now = time.time()
+            
+            # look for new and modified files
+            for path in find_files(paths):
+                try:
+                    current = state(path)
+                except OSError:
+                    continue
+                if known.get(path, (None, None))[:2] != current:
+                    known[path] = current + known.get(path, (0, 0, None))[2:]
+                    pending[path] = now
+            
+            # convert the files which did not change for debounce seconds
+            for path, changed in list(pending.items()):
+                if now - changed < debounce:
+                    continue
+                del pending[path]
+                
+                try:
+                    with open(path, "rb") as input_file:
+                        digest = hashlib.sha1(input_file.read()).digest()
+                except IOError:
+                    continue
+                if digest == known[path][2]:
+                    continue
+                known[path] = known[path][:2] + (digest,)
+                
+                result = convert_file((path, output_dir))
+                if result["status"] == "failed":
+                    print("FAILED {p} ({e})".format(p=path, e=result["error"]))
+                else:
+                    latency = time.time() - known[path][0]
+                    print("{s:<9} {p} ({l:.2f}s after save, {t:.3f}s to "
+                          "convert)".format(s=result["status"], p=path, 
+                                            l=latency, t=result["time"]))
+            
+            time.sleep(interval)
+    
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    """ convert the files given in command line, or start the GUI if none """
+    
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Convert SimpleGUI programs "
+                 "to Tkinter. Without any file given, the GUI is started.")
+    parser.add_argument("paths", nargs="*", 
+                        help="files, directories or glob patterns to convert")
+    parser.add_argument("-o", "--output-dir", 
+                        help="directory of the converted files "
+                             "(default: next to each input file)")
+    parser.add_argument("-j", "--jobs", type=int, 
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("-q", "--quiet", action="store_true", 
+                        help="print only failures and the summary")
+    parser.add_argument("-p", "--profile", action="store_true", 
+                        help="print the time and statistics of each pass")
+    parser.add_argument("-w", "--watch", action="store_true", 
+                        help="convert again the files each time they change")
+    parser.add_argument("--interval", type=float, default=0.5, metavar="SEC", 
+                        help="watch: time between checks (default: 0.5s)")
+    parser.add_argument("--debounce", type=float, default=0.3, metavar="SEC", 
+                        help="watch: time without change before converting "
+                             "a file (default: 0.3s)")
+    parser.add_argument("--time-budget", type=float, default=TIME_BUDGET, 
+                        metavar="SEC", 
+                        help="maximum time of the conversion of a file, 0 for "
+                             "no limit (default: {t}s)".format(t=TIME_BUDGET))
+    parser.add_argument("--engine", choices=ENGINES, default="regex", 
+                        help="regex: run the passes over the whole code, "
+                             "token: only over the lines found by one scan of "
+                             "the code with its own tokens "
+                             "(default: regex)")
+    parser.add_argument("--cache", metavar="DIR", 
+                        help="directory of the cache of the conversions")
+    parser.add_argument("--cache-size", type=int, default=64, metavar="MB", 
+                        help="maximum size of the cache (default: 64 MB)")
+    parser.add_argument("--asset-cache", metavar="DIR", 
+                        help="directory of the cache of the metadata of the "
+                             "sounds (default: one for the run only)")
+    parser.add_argument("--asset-ttl", type=float, default=ASSET_TTL, 
+                        metavar="SEC", 
+                        help="time before the metadata of a sound are asked "
+                             "again (default: {t}s)".format(t=ASSET_TTL))
+    parser.add_argument("--bundle", action="store_true", 
+                        help="download the sounds and images next to the "
+                             "converted files (in {d}), so that the programs "
+                             "load them from disk".format(d=BUNDLE_DIR))
+    parser.add_argument("--fps", type=float, default=FPS, 
+                        help="frames drawn per second by the converted "
+                             "programs (default: {f})".format(f=FPS))
+    parser.add_argument("--idle-fps", type=float, metavar="FPS", 
+                        help="frames drawn per second while the canvas does "
+                             "not change, until the next key or mouse event "
+                             "or timer tick (default: always --fps)")
+    args = parser.parse_args(argv)
+    if not args.fps > 0:
+        parser.error("--fps must be greater than 0")
+    if args.idle_fps is not None and not args.idle_fps > 0:
+        parser.error("--idle-fps must be greater than 0")
+    
+    if not args.paths:
+        gui()
+        return 0
+    
+    if args.watch:
+        watch(args.paths, output_dir=args.output_dir, interval=args.interval, 
+              debounce=args.debounce, cache_dir=args.cache, 
+              cache_size=args.cache_size * 1024 * 1024, 
+              time_budget=args.time_budget or None, engine=args.engine, 
+              asset_dir=args.asset_cache, asset_ttl=args.asset_ttl, 
+              bundle=args.bundle, fps=args.fps, idle_fps=args.idle_fps)
+        return 0
+    
+    results = batch_convert(find_files(args.paths), output_dir=args.output_dir, 
+                            processes=args.jobs, quiet=args.quiet, 
+                            cache_dir=args.cache, 
+                            cache_size=args.cache_size * 1024 * 1024, 
+                            profile=args.profile, 
+                            time_budget=args.time_budget or None, 
+                            engine=args.engine, asset_dir=args.asset_cache, 
+                            asset_ttl=args.asset_ttl, bundle=args.bundle, 
+                            fps=args.fps, idle_fps=args.idle_fps)
+    return 1 if [r for r in results if r["status"] == "failed"] else 0
+
+
+# time spent to import STconverter, including the compilation of PATTERNS
+IMPORT_TIME = time.time() - IMPORT_START
 
-app = Window_App(window_root)
 
-# initiate the application window
-window_root.mainloop()
+if __name__ == "__main__":
+    sys.exit(main())
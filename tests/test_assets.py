@@ -0,0 +1,153 @@
+""" tests of the assets of the converted programs, served by a local HTTP 
+    server: probing with HEAD requests (probe_assets) and downloads through 
+    the cache of the converted programs (STconverter_download) """
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 
+                                ".."))
+import STconverter
+
+try:
+    from SimpleHTTPServer import SimpleHTTPRequestHandler
+    from BaseHTTPServer import HTTPServer
+except ImportError:
+    from http.server import SimpleHTTPRequestHandler, HTTPServer
+
+
+class Handler(SimpleHTTPRequestHandler):
+    """ serves the files of the current directory, counting the requests """
+    
+    requests = []
+    
+    def do_GET(self):
+        Handler.requests.append(("GET", self.path))
+        SimpleHTTPRequestHandler.do_GET(self)
+    
+    def do_HEAD(self):
+        Handler.requests.append(("HEAD", self.path))
+        SimpleHTTPRequestHandler.do_HEAD(self)
+    
+    def log_message(self, *args):
+        pass
+
+
+class Assets_Test(unittest.TestCase):
+    
+    def setUp(self):
+        self.served = tempfile.mkdtemp()
+        self.cache = tempfile.mkdtemp()
+        with open(os.path.join(self.served, "sound.ogg"), "wb") as asset:
+            asset.write(b"OggS" * 1000)
+        
+        # SimpleHTTPRequestHandler serves the current directory
+        self.cwd = os.getcwd()
+        os.chdir(self.served)
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = "http://127.0.0.1:{p}/".format(p=self.server.server_port)
+        Handler.requests = []
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.served)
+        shutil.rmtree(self.cache)
+    
+    def download_functions(self):
+        """ return the namespace of the functions added by up_assets to the 
+            converted programs, with their cache in a temporary directory """
+        
+        modules, imports, functions = \
+            STconverter.Simplegui2Tkinter("").assets_code()
+        namespace = {"__name__": "converted"}
+        exec("import " + ", ".join(modules) + "\n" + imports + functions, 
+             namespace)
+        namespace["STconverter_cache"] = self.cache
+        return namespace
+    
+    def test_probe(self):
+        """ the metadata of the files are asked with HEAD requests """
+        
+        url = self.url + "sound.ogg"
+        assets = STconverter.probe_assets([url])
+        
+        self.assertEqual(assets[url]["size"], 4000)
+        self.assertEqual(Handler.requests, [("HEAD", "/sound.ogg")])
+    
+    def test_probe_missing(self):
+        """ a missing file fails the probe """
+        
+        self.assertRaises(IOError, STconverter.probe_assets, 
+                          [self.url + "missing.ogg"])
+    
+    def test_download(self):
+        """ a file is downloaded once, then used from the cache """
+        
+        namespace = self.download_functions()
+        url = self.url + "sound.ogg"
+        
+        path = namespace["STconverter_download"](url)
+        with open(path, "rb") as asset:
+            self.assertEqual(asset.read(), b"OggS" * 1000)
+        self.assertEqual(os.path.dirname(path), self.cache)
+        
+        self.assertEqual(namespace["STconverter_download"](url), path)
+        self.assertEqual(Handler.requests, [("GET", "/sound.ogg")])
+    
+    def test_download_missing(self):
+        """ a missing file fails its download, unless it is in the cache, 
+            which is then used as it is """
+        
+        namespace = self.download_functions()
+        url = self.url + "sound.ogg"
+        
+        self.assertRaises((IOError, OSError), namespace["STconverter_download"], 
+                          self.url + "missing.ogg")
+        
+        path = namespace["STconverter_download"](url)
+        os.remove(os.path.join(self.served, "sound.ogg"))
+        namespace["STconverter_cache_ttl"] = 0
+        self.assertEqual(namespace["STconverter_download"](url), path)
+        self.assertEqual(Handler.requests, [("GET", "/missing.ogg"), 
+                                            ("GET", "/sound.ogg"), 
+                                            ("GET", "/sound.ogg")])
+    
+    def test_conversion_cache(self):
+        """ a cached conversion is used only while the sizes of its sounds, 
+            which choose the one played as music, did not change """
+        
+        url = self.url + "music.ogg"
+        source = "import simplegui\n" \
+                 "music = simplegui.load_sound('{u}')\n" \
+                 "music.play()\n".format(u=url)
+        cache = STconverter.Conversion_Cache(self.cache)
+        with open(os.path.join(self.served, "music.ogg"), "wb") as asset:
+            asset.write(b"OggS" * 200000)
+        
+        code = STconverter.convert(source, cache, 
+                                   assets=STconverter.Asset_Cache())
+        self.assertIn("pygame.mixer.music.load(", code)
+        self.assertEqual(STconverter.convert(source, cache, 
+                             assets=STconverter.Asset_Cache()), code)
+        self.assertEqual(cache.hits, 1)
+        
+        with open(os.path.join(self.served, "music.ogg"), "wb") as asset:
+            asset.write(b"OggS" * 1000)
+        code = STconverter.convert(source, cache, 
+                                   assets=STconverter.Asset_Cache())
+        self.assertNotIn("pygame.mixer.music.load(", code)
+        self.assertIn("pygame.mixer.Sound(", code)
+        self.assertEqual(cache.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+""" tests of the engines of the conversion """
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 
+                                ".."))
+import STconverter
+
+
+SOURCE = """import simplegui
+
+def draw(canvas):
+    canvas.draw_line((0, 0), (10, 10), 2, "Red")
+
+frame = simplegui.create_frame("Test", 100, 100)
+frame.set_draw_handler(draw)
+frame.start()
+"""
+
+
+class Engines_Test(unittest.TestCase):
+    
+    def test_same_code(self):
+        """ both engines convert the code in the same way """
+        
+        self.assertEqual(STconverter.convert(SOURCE, engine="regex"), 
+                         STconverter.convert(SOURCE, engine="token"))
+    
+    def test_whole_code_again(self):
+        """ when the regions cannot be put back in the code, the state of 
+            their conversion is reset to convert the code as a whole """
+        
+        converter = STconverter.Simplegui2Tkinter(SOURCE, engine="token")
+        converter.find_regions()
+        converter.run_passes()
+        self.assertTrue(converter.calls)
+        
+        # a pass matching across two regions merges them
+        converter.code = converter.code.replace(STconverter.REGION_SEP, "", 1)
+        converter.splice_regions()
+        
+        self.assertEqual(converter.code, SOURCE)
+        self.assertEqual(converter.gaps, None)
+        self.assertEqual(converter.passes, [])
+        self.assertFalse(converter.calls)
+        self.assertEqual(converter.index, {})
+        self.assertEqual(converter.modules, [])
+        self.assertEqual(converter.journal.edits, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
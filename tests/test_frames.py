@@ -0,0 +1,117 @@
+""" tests of the frame loop of the converted programs (STconverter_frames 
+    drawing on STconverter_canvas), run with a Tcl interpreter standing in 
+    for the canvas """
+
+import os
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 
+                                ".."))
+import STconverter
+
+try:
+    import Tkinter as tkinter
+except ImportError:
+    import tkinter
+
+
+SOURCE = """import simplegui
+
+def draw(canvas):
+    canvas.draw_line((0, 0), (10, 10), 2, "Red")
+
+frame = simplegui.create_frame("Test", 100, 100)
+frame.set_draw_handler(draw)
+frame.start()
+"""
+
+# canvas command of the Tcl interpreter: numbers the items created, and fails 
+# while fail is set
+CANVAS = """
+set fail 0
+set items 0
+proc .canvas {args} {
+    global fail items
+    if {$fail} {error "drawing failed"}
+    if {[lindex $args 0] eq "create"} {return [incr items]}
+}
+"""
+
+
+class Stand_In_Canvas:
+    """ canvas whose Tcl command is the one of CANVAS """
+    
+    def __init__(self):
+        self.tk = tkinter.Tcl()
+        self.tk.eval(CANVAS)
+        self.deleted = 0
+    
+    def __str__(self):
+        return ".canvas"
+    
+    def delete(self, *items):
+        self.deleted += 1
+
+
+class Stand_In_Root:
+    """ window whose callbacks are only recorded """
+    
+    def __init__(self):
+        self.callbacks = []
+    
+    def after(self, delay, callback):
+        self.callbacks.append(callback)
+        return len(self.callbacks)
+    
+    def after_cancel(self, pending):
+        pass
+    
+    def bind_all(self, *args):
+        pass
+
+
+class Frames_Test(unittest.TestCase):
+    
+    def setUp(self):
+        code = STconverter.convert(SOURCE)
+        classes = re.findall(r"(?m)^class STconverter_(?:canvas|frames):\n"
+                             r"(?:(?: .*)?\n)*", code)
+        self.namespace = {}
+        exec("import time, collections\n" + "".join(classes), self.namespace)
+        
+        self.tk_canvas = Stand_In_Canvas()
+        self.canvas = self.namespace["STconverter_canvas"](self.tk_canvas)
+        self.root = Stand_In_Root()
+    
+    def draw(self):
+        self.canvas.begin_frame()
+        self.canvas.create_line(0, 0, 10, 10, width=2, fill="Red")
+        return self.canvas.end_frame()
+    
+    def test_failed_frame(self):
+        """ a frame whose drawing fails clears the canvas, and the next frame 
+            is still scheduled and draws the canvas again """
+        
+        frames = self.namespace["STconverter_frames"](self.root, self.draw)
+        frames.tick()
+        self.assertEqual(len(self.root.callbacks), 1)
+        
+        self.canvas.items[0] = self.canvas.items[0][:1] + ((0, 0, 10, 20),) + \
+                               self.canvas.items[0][2:]
+        self.tk_canvas.tk.eval("set fail 1")
+        self.assertRaises(tkinter.TclError, self.root.callbacks.pop())
+        self.assertEqual(self.tk_canvas.deleted, 1)
+        self.assertEqual(self.canvas.items, [])
+        self.assertEqual(len(self.root.callbacks), 1)
+        
+        self.tk_canvas.tk.eval("set fail 0")
+        self.root.callbacks.pop()()
+        self.assertEqual(len(self.canvas.items), 1)
+        self.assertEqual(self.tk_canvas.tk.eval("set items"), "2")
+        self.assertEqual(len(self.root.callbacks), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+""" tests of the imports added to the converted code """
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 
+                                ".."))
+import STconverter
+
+
+# simplegui imported in a block, as done by the programs which also run with 
+# SimpleGUICS2Pygame
+HEADER = """try:
+    import simplegui
+except ImportError:
+    import SimpleGUICS2Pygame.simpleguics2pygame as simplegui
+
+"""
+
+TIMER = """def tick():
+    pass
+
+timer = simplegui.create_timer(100, tick)
+timer.start()
+"""
+
+IMAGE = """image = simplegui.load_image("http://example.com/image.png")
+
+def draw_image(canvas):
+    canvas.draw_image(image, (50, 50), (100, 100), (50, 50), (100, 100))
+
+"""
+
+DRAW = """def draw(canvas):
+    canvas.draw_line((0, 0), (10, 10), 2, "Red")
+
+frame = simplegui.create_frame("Test", 100, 100)
+frame.set_draw_handler(draw)
+frame.start()
+"""
+
+
+class Imports_Test(unittest.TestCase):
+    
+    def check(self, source):
+        """ the code converted by both engines compiles, with the modules of 
+            the added code imported once at the top level """
+        
+        for engine in STconverter.ENGINES:
+            code = STconverter.convert(source, engine=engine)
+            compile(code, "converted.py", "exec")
+            imports = [line for line in code.splitlines() 
+                       if line.startswith("import ") and "Tkinter" not in line]
+            self.assertEqual(len(imports), 1, imports)
+    
+    def test_block_draw_handler(self):
+        """ canvas of a program importing simplegui in a block """
+        
+        self.check(HEADER + DRAW)
+    
+    def test_block_timer(self):
+        """ timer of a program importing simplegui in a block """
+        
+        self.check(HEADER + TIMER)
+    
+    def test_block_draw_handler_timer(self):
+        """ canvas and timer of a program importing simplegui in a block """
+        
+        self.check(HEADER + TIMER + DRAW)
+    
+    def test_block_image(self):
+        """ images of a program importing simplegui in a block """
+        
+        self.check(HEADER + IMAGE + DRAW)
+
+
+if __name__ == "__main__":
+    unittest.main()
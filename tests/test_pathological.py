@@ -0,0 +1,63 @@
+""" timed regression tests of the pathological programs of the benchmark: 
+    long unbalanced lines, which made the conversion backtrack exponentially, 
+    must be converted in a time growing about linearly with their length """
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 
+                                "..", "Benchmarks"))
+import benchmark
+import STconverter
+
+
+# sizes of the pathological lines converted (the second one 4 times longer), 
+# and budgets: time of each conversion, and ratio of the times of the two 
+# sizes (16 for a time growing with the square of the length), with a margin 
+# for the timer resolution and the noise of a loaded machine
+SIZES = (500, 2000)
+BUDGET = 10
+RATIO = 10
+MARGIN = 0.2
+
+
+def conversion_time(case, size, engine):
+    """ return the best time of 3 conversions of a pathological program """
+    
+    code = benchmark.generate_pathological(case, size)
+    times = []
+    for n in range(3):
+        converter = STconverter.Simplegui2Tkinter(code, time_budget=BUDGET, 
+                                                  engine=engine)
+        start = time.time()
+        converter.convert()
+        times.append(time.time() - start)
+    return min(times)
+
+
+class Pathological_Test(unittest.TestCase):
+    
+    def check(self, engine):
+        for case in sorted(benchmark.PATHOLOGICAL):
+            small, large = [conversion_time(case, size, engine) 
+                            for size in SIZES]
+            self.assertLess(large, RATIO * small + MARGIN, 
+                            "{c}: {s:.4f}s for x{a}, {l:.4f}s for x{b}".format(
+                                c=case, s=small, l=large, a=SIZES[0], 
+                                b=SIZES[1]))
+    
+    def test_regex(self):
+        """ linear time of the regex engine """
+        
+        self.check("regex")
+    
+    def test_token(self):
+        """ linear time of the token engine """
+        
+        self.check("token")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+""" tests of the rules added with STconverter.register_rule """
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 
+                                ".."))
+import STconverter
+
+
+SOURCE = """import simplegui
+import simpleplot
+
+def draw(canvas):
+    canvas.draw_line((0, 0), (10, 10), 2, "Red")
+
+title = "Plot"
+simpleplot.plot_lines(title, 400, 300)    # the plot
+simpleplot.plot_lines(title, 
+                      200, 100)
+frame = simplegui.create_frame("Test", 100, 100)
+frame.set_draw_handler(draw)
+frame.start()
+"""
+
+
+def setUpModule():
+    STconverter.register_rule("test_plot", "simpleplot.plot_lines", 
+        r"{I}simpleplot.plot_lines\( *{Pq}{S}{P}{S}{P} *\){M}", 
+        "\\1print(\\2, \\3, \\4)\\5")
+
+
+def tearDownModule():
+    STconverter.unregister_rule("test_plot")
+
+
+def tables():
+    """ return a copy of the global tables changed by register_rule """
+    
+    return (dict(STconverter.SG), dict(STconverter.PATTERNS), 
+            dict(STconverter.LITERALS), dict(STconverter.ANCHORS), 
+            list(STconverter.RULES), set(STconverter.CALL_NAMES), 
+            set(STconverter.REGION_NAMES), STconverter.TOKENS)
+
+
+class Register_Rule_Test(unittest.TestCase):
+    
+    def test_engines(self):
+        """ the registered rule is applied by both engines """
+        
+        codes = [STconverter.convert(SOURCE, engine=engine) 
+                 for engine in STconverter.ENGINES]
+        
+        for code in codes:
+            self.assertEqual(code.count("simpleplot.plot_lines"), 0)
+            self.assertIn("print(title, 400, 300)    # the plot", code)
+            self.assertIn("print(title, 200, 100)", code)
+        self.assertEqual(codes[0], codes[1])
+    
+    def test_invalid_name(self):
+        """ a rule cannot replace an existing one """
+        
+        self.assertRaises(ValueError, STconverter.register_rule, "line", 
+                          "draw_line", r"{C}.draw_line\(\)", "")
+    
+    def test_unregister(self):
+        """ unregistering a rule restores the tables, keeping the trigger of 
+            another rule using it """
+        
+        before = tables()
+        STconverter.register_rule("test_bars", "simpleplot.plot_bars", 
+            r"{I}simpleplot.plot_bars\( *{P} *\){M}", "\\1print(\\2)\\3")
+        STconverter.register_rule("test_plot_again", "simpleplot.plot_lines", 
+            r"{I}simpleplot.plot_lines\(\){M}", "\\1print()\\2")
+        self.assertNotEqual(tables(), before)
+        
+        STconverter.unregister_rule("test_bars")
+        STconverter.unregister_rule("test_plot_again")
+        self.assertEqual(tables(), before)
+        self.assertIn("simpleplot.plot_lines", STconverter.CALL_NAMES)
+        self.assertRaises(ValueError, STconverter.unregister_rule, "line")
+
+
+if __name__ == "__main__":
+    unittest.main()
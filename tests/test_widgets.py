@@ -0,0 +1,24 @@
+""" tests of the widgets of the control panel """
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 
+                                ".."))
+import STconverter
+
+
+class Widgets_Test(unittest.TestCase):
+    
+    def test_button_width(self):
+        """ the width of a button is an integer on all the interpreters """
+        
+        code = STconverter.convert("import simplegui\n"
+                                   "frame = simplegui.create_frame('T', 100, 100)\n"
+                                   "frame.add_button('Go', go, 105)\n")
+        self.assertIn("go_bt.config(width=10)\n", code)
+
+
+if __name__ == "__main__":
+    unittest.main()